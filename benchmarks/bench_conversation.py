@@ -0,0 +1,84 @@
+"""
+Cost of building the request body of one more turn in a long conversation:
+previous behaviour (fresh dicts and full `json.dumps` of the history every turn) vs. cached
+per-message serialization, with and without the context window trimming to the gpt-4 budget.
+
+    python -m benchmarks.bench_conversation [--turns 1000 10000]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+from task.clients.custom_client import CustomDialClient
+from task.models.context import ContextWindow
+from task.models.conversation import Conversation
+from task.models.message import Message
+from task.models.role import Role
+
+
+@dataclass
+class LegacyMessage:
+    role: Role
+    content: str
+
+    def to_dict(self) -> dict[str, str]:
+        return {"role": self.role.value, "content": self.content}
+
+
+def _turn_text(turn: int) -> tuple[str, str]:
+    return f"Question number {turn}: what happened next?", f"Answer number {turn}. " + "Something happened. " * 10
+
+
+def legacy_body(messages: list[LegacyMessage]) -> bytes:
+    return json.dumps({"stream": True, "messages": [msg.to_dict() for msg in messages]}).encode("utf-8")
+
+
+def _measure(build, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        build()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    build()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    client = CustomDialClient("gpt-4o")
+    for turns in args.turns:
+        legacy = [LegacyMessage(Role.SYSTEM, "You are an assistant.")]
+        conversation = Conversation()
+        conversation.add_message(Message(Role.SYSTEM, "You are an assistant."))
+        for turn in range(turns):
+            question, answer = _turn_text(turn)
+            legacy += [LegacyMessage(Role.USER, question), LegacyMessage(Role.AI, answer)]
+            conversation.add_message(Message(Role.USER, question))
+            conversation.add_message(Message(Role.AI, answer))
+        # warm the per-message caches like the previous turns of a real session would
+        client._encode_request(conversation.get_messages(), stream=True)
+
+        full_window = ContextWindow(10 ** 9)
+        trimmed_window = ContextWindow.for_deployment("gpt-4")
+        cases = {
+            "legacy": lambda: legacy_body(legacy),
+            "cached": lambda: client._encode_request(full_window.fit(conversation), stream=True),
+            "cached+window": lambda: client._encode_request(trimmed_window.fit(conversation), stream=True),
+        }
+        print(f"{turns} turns ({conversation.token_count} estimated tokens):")
+        for name, build in cases.items():
+            elapsed, peak = _measure(build, args.repeat)
+            print(f"  {name:<14} {elapsed * 1000:8.3f} ms/turn  peak alloc {peak / 1024:9.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
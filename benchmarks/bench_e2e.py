@@ -0,0 +1,185 @@
+"""
+End-to-end load benchmark of DialClient and CustomDialClient against the local mock server.
+Every client runs a fixed number of streaming (or non-streaming async) requests at increasing
+concurrency and reports throughput, p50/p95/p99 latency, TTFT and peak memory; results can be
+saved as JSON to compare runs. Every level runs in a fresh process, so its peak RSS is not inflated
+by the levels before it.
+
+    python -m benchmarks.bench_e2e [--concurrency 1 4 16 64] [--output results.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import platform
+import resource
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from multiprocessing import get_context
+
+from benchmarks.mock_server import MockSettings, serve_in_process
+from task.clients.base import BaseClient
+from task.clients.client import DialClient
+from task.clients.custom_client import CustomDialClient
+from task.clients.metrics import ClientHooks, RequestTrace
+from task.models.message import Message
+from task.models.role import Role
+
+CLIENTS = {"dial": DialClient, "custom": CustomDialClient}
+MESSAGES = [
+    Message(Role.SYSTEM, "You are an assistant who answers concisely and informatively."),
+    Message(Role.USER, "What is the capital of France?"),
+]
+
+
+class _TraceCollector(ClientHooks):
+    """
+    Keeps raw per-request timings, histograms are too coarse for exact percentiles.
+    """
+
+    def __init__(self):
+        self.ttft: list[float] = []
+        self.durations: list[float] = []
+        self.tokens = 0
+        self.errors = 0
+
+    def on_complete(self, trace: RequestTrace) -> None:
+        if trace.ttft is not None:
+            self.ttft.append(trace.ttft)
+        self.durations.append(trace.duration)
+        self.tokens += trace.tokens
+
+    def on_error(self, trace: RequestTrace, error: BaseException) -> None:
+        self.errors += 1
+
+
+def percentile(samples: list[float], q: float) -> float | None:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _distribution(samples: list[float]) -> dict[str, float | None]:
+    return {f"p{int(q * 100)}_ms": None if (value := percentile(samples, q)) is None else value * 1000
+            for q in (0.5, 0.95, 0.99)}
+
+
+async def _run_level(client: BaseClient, concurrency: int, requests: int, stream: bool) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            with contextlib.suppress(Exception):
+                if stream:
+                    await client.stream_completion(MESSAGES, sinks=[])
+                else:
+                    await client.aget_completion(MESSAGES)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+
+
+async def _benchmark_level(name: str, base_url: str, concurrency: int, args: argparse.Namespace) -> dict:
+    collector = _TraceCollector()
+    async with CLIENTS[name]("gpt-4o", endpoint=base_url) as client:
+        await _run_level(client, concurrency, min(concurrency, args.requests), args.mode == "stream")
+        client.add_hooks(collector)
+        requests = max(args.requests, concurrency * 2)
+
+        if args.tracemalloc:
+            tracemalloc.start()
+        started = time.perf_counter()
+        await _run_level(client, concurrency, requests, args.mode == "stream")
+        elapsed = time.perf_counter() - started
+        traced_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+        tracemalloc.stop()
+
+    return {
+        "client": name,
+        "mode": args.mode,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": collector.errors,
+        "throughput_rps": len(collector.durations) / elapsed,
+        "throughput_tokens_per_s": collector.tokens / elapsed,
+        "latency": _distribution(collector.durations),
+        "ttft": _distribution(collector.ttft),
+        # high-water mark of this process, i.e. of this level alone
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_traced_mb": None if traced_peak is None else traced_peak / 1024 / 1024,
+    }
+
+
+def _run_in_process(name: str, base_url: str, concurrency: int, args: argparse.Namespace) -> dict:
+    return asyncio.run(_benchmark_level(name, base_url, concurrency, args))
+
+
+def _benchmark_client(name: str, base_url: str, args: argparse.Namespace) -> list[dict]:
+    results = []
+    for concurrency in args.concurrency:
+        # ru_maxrss never goes down, a fresh process per level keeps peaks comparable
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            result = executor.submit(_run_in_process, name, base_url, concurrency, args).result()
+        print(_format(result))
+        results.append(result)
+    return results
+
+
+def _format(result: dict) -> str:
+    def ms(value: float | None) -> str:
+        return "   n/a" if value is None else f"{value:6.1f}"
+
+    latency, ttft = result["latency"], result["ttft"]
+    return (
+        f"{result['client']:<7} c={result['concurrency']:<4} "
+        f"{result['throughput_rps']:8.1f} req/s {result['throughput_tokens_per_s']:9.1f} tok/s  "
+        f"latency p50/p95/p99 {ms(latency['p50_ms'])} {ms(latency['p95_ms'])} {ms(latency['p99_ms'])} ms  "
+        f"ttft p50/p95 {ms(ttft['p50_ms'])} {ms(ttft['p95_ms'])} ms  "
+        f"errors {result['errors']}  rss {result['peak_rss_mb']:.0f} MB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", nargs="+", choices=list(CLIENTS), default=list(CLIENTS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--mode", choices=["stream", "complete"], default="stream",
+                        help="stream_completion or non-streaming aget_completion")
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--latency", type=float, default=0.05, help="mock server time to first byte, seconds")
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--token-rate", type=float, default=500.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--tracemalloc", action="store_true", help="also report traced Python heap peak (slow)")
+    parser.add_argument("--output", default=None, help="write results to this JSON file")
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        latency=args.latency,
+        tokens=args.tokens,
+        token_rate=args.token_rate,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=0,
+    )
+    results = []
+    with serve_in_process(settings) as base_url:
+        for name in args.clients:
+            results += _benchmark_client(name, base_url, args)
+
+    if args.output:
+        report = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "mock_settings": asdict(settings),
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
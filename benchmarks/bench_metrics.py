@@ -0,0 +1,77 @@
+"""
+Overhead of client instrumentation on the streaming path.
+Per chunk, clients run `if trace: trace.chunk()`; the microbenchmark times that statement with
+no hooks registered (trace is None) and with MetricsRecorder against an empty loop, then long
+streams from the local mock server are timed end to end with and without hooks.
+
+    python -m benchmarks.bench_metrics [--chunks 200000] [--tokens 2000]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.mock_server import MockSettings, serve_in_thread
+from task.clients.custom_client import CustomDialClient
+from task.clients.metrics import MetricsRecorder, RequestTrace
+from task.models.message import Message
+from task.models.role import Role
+
+
+def _loop(chunks: int, trace: RequestTrace | None, instrumented: bool) -> float:
+    started = time.perf_counter()
+    if instrumented:
+        for _ in range(chunks):
+            if trace:
+                trace.chunk()
+    else:
+        for _ in range(chunks):
+            pass
+    return (time.perf_counter() - started) / chunks
+
+
+def _best_of(repeat: int, measure) -> float:
+    return min(measure() for _ in range(repeat))
+
+
+async def _stream(client: CustomDialClient, count: int) -> float:
+    messages = [Message(Role.USER, "What is the capital of France?")]
+    started = time.perf_counter()
+    for _ in range(count):
+        await client.stream_completion(messages, sinks=[])
+    return (time.perf_counter() - started) / count
+
+
+async def _end_to_end(base_url: str, count: int) -> dict[str, float]:
+    disabled = CustomDialClient("gpt-4o", endpoint=base_url)
+    enabled = CustomDialClient("gpt-4o", endpoint=base_url)
+    enabled.add_hooks(MetricsRecorder())
+    async with disabled, enabled:
+        await _stream(disabled, 2)
+        await _stream(enabled, 2)
+        return {"disabled": await _stream(disabled, count), "enabled": await _stream(enabled, count)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=200000)
+    parser.add_argument("--tokens", type=int, default=2000, help="chunks per mock stream")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    trace = RequestTrace("gpt-4o", True, (MetricsRecorder(),))
+    empty = _best_of(args.repeat, lambda: _loop(args.chunks, None, instrumented=False))
+    disabled = _best_of(args.repeat, lambda: _loop(args.chunks, None, instrumented=True))
+    enabled = _best_of(args.repeat, lambda: _loop(args.chunks, trace, instrumented=True))
+    print(f"per chunk, hooks disabled:     {(disabled - empty) * 1e9:8.1f} ns")
+    print(f"per chunk, MetricsRecorder:    {(enabled - empty) * 1e9:8.1f} ns")
+
+    with serve_in_thread(MockSettings(tokens=args.tokens)) as base_url:
+        streams = asyncio.run(_end_to_end(base_url, args.requests))
+    for name, elapsed in streams.items():
+        print(f"mock stream, hooks {name:<9} {elapsed * 1e3:8.2f} ms/request  "
+              f"{elapsed / args.tokens * 1e6:6.2f} us/chunk")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Per-request latency of CustomDialClient with pooled sessions vs. the previous
+session-per-call behaviour, measured against the local mock server.
+
+    python -m benchmarks.bench_pooling [--requests 300]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import aiohttp
+import requests
+
+from benchmarks.mock_server import serve_in_thread
+from task.clients.custom_client import CustomDialClient
+from task.models.message import Message
+from task.models.role import Role
+
+MESSAGES = [Message(Role.USER, "What is the capital of France?")]
+
+
+def _legacy_get(endpoint: str, api_key: str) -> None:
+    response = requests.post(endpoint, headers={"api-key": api_key}, json={
+        "messages": [msg.to_dict() for msg in MESSAGES],
+    })
+    response.json()
+
+
+async def _legacy_stream(endpoint: str, api_key: str) -> None:
+    request_data = {"stream": True, "messages": [msg.to_dict() for msg in MESSAGES]}
+    async with aiohttp.ClientSession() as session:
+        async with session.post(endpoint, json=request_data, headers={"api-key": api_key}) as response:
+            async for _ in response.content:
+                pass
+
+
+def _summary(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    return f"mean {statistics.mean(samples) * 1000:7.3f} ms  p95 {p95 * 1000:7.3f} ms"
+
+
+def _measure_sync(fn, count: int) -> list[float]:
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def _measure_async(fn, count: int) -> list[float]:
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def _run(base_url: str, count: int) -> dict[str, list[float]]:
+    client = CustomDialClient("gpt-4o", endpoint=base_url)
+    endpoint = client._endpoint
+    api_key = client._api_key
+
+    results = {
+        "get_completion legacy": _measure_sync(lambda: _legacy_get(endpoint, api_key), count),
+        "get_completion pooled": _measure_sync(lambda: client.get_completion(MESSAGES), count),
+        "stream_completion legacy": await _measure_async(lambda: _legacy_stream(endpoint, api_key), count),
+        "stream_completion pooled": await _measure_async(lambda: client.stream_completion(MESSAGES, sinks=[]), count),
+    }
+    await client.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--json", action="store_true", help="print raw mean latencies as JSON")
+    args = parser.parse_args()
+
+    with serve_in_thread() as base_url:
+        results = asyncio.run(_run(base_url, args.requests))
+
+    if args.json:
+        print(json.dumps({name: statistics.mean(samples) for name, samples in results.items()}, indent=2))
+        return
+    for name, samples in results.items():
+        print(f"{name:<26} {_summary(samples)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Microbenchmark of SSE stream parsing: previous line-by-line `json.loads` parsing
+vs. SSEDecoder with `parse_delta`.
+Streams are recorded in the DIAL chunk format (compact and pretty-printed) and replayed
+split into network chunks of different sizes.
+
+    python -m benchmarks.bench_sse [--tokens 2000] [--repeat 5]
+"""
+import argparse
+import json
+import time
+
+from task.clients.sse import DONE, SSEDecoder, parse_delta
+
+CHUNK_SIZES = [16, 128, 1024, 16384]
+WORDS = "Paris is the capital and most populous city of France, «Ville Lumière» 🇫🇷.".split(" ")
+
+
+def record_stream(tokens: int, indent: int | None = None) -> bytes:
+    frames = []
+    for i in range(tokens + 1):
+        last = i == tokens
+        chunk = {
+            "id": "chatcmpl-BgOcXoaiGfrqHDyu9dcOUMFmWNcgL",
+            "object": "chat.completion.chunk",
+            "created": 1749444117,
+            "model": "gpt-4o-2024-08-06",
+            "system_fingerprint": "fp_ee1d74bde0",
+            "choices": [{
+                "index": 0,
+                "delta": {} if last else {"content": WORDS[i % len(WORDS)] + " "},
+                "logprobs": None,
+                "finish_reason": "stop" if last else None,
+            }],
+            "usage": {"prompt_tokens": 21, "completion_tokens": tokens, "total_tokens": tokens + 21} if last else None,
+        }
+        payload = json.dumps(chunk, indent=indent, ensure_ascii=False)
+        frames.append("".join(f"data: {line}\n" for line in payload.split("\n")) + "\n")
+    frames.append(f"data: {DONE}\n\n")
+    return "".join(frames).encode("utf-8")
+
+
+def split(stream: bytes, size: int) -> list[bytes]:
+    return [stream[i:i + size] for i in range(0, len(stream), size)]
+
+
+def _readlines(chunks: list[bytes]):
+    # mirrors aiohttp `StreamReader` line iteration: pieces are buffered until a newline arrives
+    pending = []
+    for chunk in chunks:
+        start = 0
+        newline = chunk.find(b"\n")
+        while newline != -1:
+            pending.append(chunk[start:newline + 1])
+            yield b"".join(pending)
+            pending = []
+            start = newline + 1
+            newline = chunk.find(b"\n", start)
+        if start < len(chunk):
+            pending.append(chunk[start:])
+
+
+def legacy(chunks: list[bytes]) -> str:
+    contents = []
+    for line in _readlines(chunks):
+        decoded = line.decode("utf-8").strip()
+        if not decoded or not decoded.startswith("data: "):
+            continue
+        payload = decoded[6:]
+        if payload == DONE:
+            break
+        content = json.loads(payload)["choices"][0].get("delta", {}).get("content")
+        if content:
+            contents.append(content)
+    return "".join(contents)
+
+
+def decoder(chunks: list[bytes]) -> str:
+    contents = []
+    sse_decoder = SSEDecoder()
+    for chunk in chunks:
+        for event in sse_decoder.feed(chunk):
+            if event.data == DONE:
+                continue
+            content = parse_delta(event.data).content
+            if content:
+                contents.append(content)
+    return "".join(contents)
+
+
+def _best_of(fn, chunks: list[bytes], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(chunks)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    parsers = {"legacy": legacy, "decoder": decoder}
+    for layout, indent in (("compact", None), ("pretty", 4)):
+        stream = record_stream(args.tokens, indent)
+        # pretty-printed multi-line events are not understood by the line-by-line parser
+        names = [name for name in parsers if layout == "compact" or name != "legacy"]
+        print(f"{layout} stream: {args.tokens} events, {len(stream) / 1024:.0f} KiB")
+        for size in CHUNK_SIZES:
+            chunks = split(stream, size)
+            expected = decoder(chunks)
+            cells = []
+            for name in names:
+                assert parsers[name](chunks) == expected, name
+                elapsed = _best_of(parsers[name], chunks, args.repeat)
+                cells.append(f"{name} {elapsed / args.tokens * 1e6:6.2f} us/event")
+            print(f"  chunk {size:>6} B: " + "  ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Local stand-in for the DIAL chat completions endpoint, both plain JSON and SSE streaming.
+
+    python -m benchmarks.mock_server [--port 8080] [--latency 0.2] [--token-rate 50] [--rate-limit-rate 0.05]
+
+Prints the base URL to stdout once it accepts connections.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Iterator
+
+from aiohttp import web
+
+COMPLETION_PATH = "/openai/deployments/{name}/chat/completions"
+WORDS = "Paris is the capital and most populous city of France, located on the Seine river.".split(" ")
+
+
+@dataclass(frozen=True)
+class MockSettings:
+    latency: float = 0.0
+    tokens: int = 6
+    chunk_tokens: int = 1
+    token_rate: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    seed: int | None = None
+
+
+def _chunk(
+        content: str | None,
+        finish_reason: str | None = None,
+        usage: dict | None = None,
+        role: str | None = None,
+) -> bytes:
+    delta = {} if content is None else {"content": content}
+    if role:
+        delta["role"] = role
+    data = {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": "mock",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        "usage": usage,
+    }
+    return b"data: " + json.dumps(data).encode("utf-8") + b"\n\n"
+
+
+def _usage(request_body: dict, tokens: int) -> dict:
+    prompt_tokens = sum(len(msg.get("content") or "") // 4 + 4 for msg in request_body.get("messages", []))
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": tokens, "total_tokens": prompt_tokens + tokens}
+
+
+class MockDialServer:
+
+    def __init__(self, settings: MockSettings):
+        self._settings = settings
+        self._random = random.Random(settings.seed)
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(COMPLETION_PATH, self._completions)
+        return app
+
+    async def _completions(self, request: web.Request) -> web.StreamResponse:
+        settings = self._settings
+        body = await request.json()
+
+        roll = self._random.random()
+        if roll < settings.rate_limit_rate:
+            return web.json_response(
+                {"error": {"message": "Rate limit exceeded", "code": "429"}},
+                status=429,
+                headers={"Retry-After": str(settings.retry_after)},
+            )
+        if roll < settings.rate_limit_rate + settings.error_rate:
+            return web.json_response({"error": {"message": "Internal server error"}}, status=500)
+
+        if settings.latency:
+            await asyncio.sleep(settings.latency)
+
+        words = [WORDS[i % len(WORDS)] + " " for i in range(settings.tokens)]
+        if not body.get("stream"):
+            if settings.token_rate:
+                await asyncio.sleep(settings.tokens / settings.token_rate)
+            return web.json_response({
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": "mock",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(words)},
+                    "finish_reason": "stop",
+                }],
+                "usage": _usage(body, settings.tokens),
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(_chunk("", role="assistant"))
+        for start in range(0, settings.tokens, settings.chunk_tokens):
+            piece = words[start:start + settings.chunk_tokens]
+            if settings.token_rate:
+                await asyncio.sleep(len(piece) / settings.token_rate)
+            await response.write(_chunk("".join(piece)))
+        await response.write(_chunk(None, "stop", _usage(body, settings.tokens)))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+
+def create_app(settings: MockSettings | None = None) -> web.Application:
+    return MockDialServer(settings or MockSettings()).create_app()
+
+
+@contextmanager
+def serve_in_thread(settings: MockSettings | None = None, host: str = "127.0.0.1", port: int = 0) -> Iterator[str]:
+    """
+    Run the mock server in a background thread and yield its base URL.
+    Cheap to start, but shares the GIL with the code under test.
+    """
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(create_app(settings))
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, host, port)
+    loop.run_until_complete(site.start())
+    bound_port = site._server.sockets[0].getsockname()[1]
+
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://{host}:{bound_port}"
+    finally:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+@contextmanager
+def serve_in_process(settings: MockSettings | None = None, host: str = "127.0.0.1", port: int = 0) -> Iterator[str]:
+    """
+    Run the mock server in a subprocess and yield its base URL, so it does not compete with the
+    code under test for the GIL.
+    """
+    settings = settings or MockSettings()
+    args = [sys.executable, "-m", "benchmarks.mock_server", "--host", host, "--port", str(port)]
+    for name, value in asdict(settings).items():
+        if value is not None:
+            args += [f"--{name.replace('_', '-')}", str(value)]
+
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, text=True)
+    try:
+        yield process.stdout.readline().strip()
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def _serve(settings: MockSettings, host: str, port: int) -> None:
+    runner = web.AppRunner(create_app(settings), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    print(f"http://{host}:{site._server.sockets[0].getsockname()[1]}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before the first byte")
+    parser.add_argument("--tokens", type=int, default=6, help="tokens in every response")
+    parser.add_argument("--chunk-tokens", type=int, default=1, help="tokens per stream chunk")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="tokens per second, 0 for no limit")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests failing with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of 429 responses, seconds")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    settings = MockSettings(**{name: getattr(args, name) for name in MockSettings.__dataclass_fields__})
+    try:
+        asyncio.run(_serve(settings, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import asyncio
 
 from task.clients.client import DialClient
 from task.constants import DEFAULT_SYSTEM_PROMPT
+from task.models.context import ContextWindow
 from task.models.conversation import Conversation
 from task.models.message import Message
 from task.models.role import Role
@@ -11,8 +12,9 @@ async def start(stream: bool) -> None:
     # 1.1 Create DialClient (swap with CustomDialClient to test step 9)
     client = DialClient("gpt-4o")
 
-    # 2. Create Conversation object
+    # 2. Create Conversation object and context window that keeps requests within the model limit
     conversation = Conversation()
+    context_window = ContextWindow.for_deployment(client.deployment_name)
 
     # 3. Get system prompt or use default
     system_prompt = input("Provide System prompt or press 'enter' to continue.\n> ").strip()
@@ -22,25 +24,28 @@ async def start(stream: bool) -> None:
 
     # 4. Infinite loop for user input
     print("\nType your question or 'exit' to quit.")
-    while True:
-        user_input = input("> ").strip()
-
-        # 5. Exit condition
-        if user_input.lower() == "exit":
-            print("Exiting the chat. Goodbye!")
-            break
-
-        # 6. Add user message to conversation history
-        conversation.add_message(Message(Role.USER, user_input))
-
-        # 7. Stream or regular completion
-        if stream:
-            response = await client.stream_completion(conversation.get_messages())
-        else:
-            response = client.get_completion(conversation.get_messages())
-
-        # 8. Add AI response to conversation history
-        conversation.add_message(response)
+    async with client:
+        while True:
+            user_input = input("> ").strip()
+
+            # 5. Exit condition
+            if user_input.lower() == "exit":
+                print("Exiting the chat. Goodbye!")
+                break
+
+            # 6. Add user message to conversation history
+            conversation.add_message(Message(Role.USER, user_input))
+
+            # 7. Stream or regular completion
+            messages = context_window.fit(conversation)
+            if stream:
+                response = await client.stream_completion(messages)
+            else:
+                response = await client.aget_completion(messages)
+                print(response.content)
+
+            # 8. Add AI response to conversation history
+            conversation.add_message(response)
 
 
 asyncio.run(
@@ -0,0 +1,200 @@
+"""
+Bulk completion runner over JSONL files.
+
+    python -m task.batch in.jsonl out.jsonl [--client custom] [--concurrency 16] [--rps 10] [--tpm 200000]
+
+Every input line is a JSON object with `id` and `messages` (list of `{"role", "content"}`).
+Every output line is `{"id", "content"}` or `{"id", "error", "status_code"}` and is written as soon
+as its request completes, so output order differs from input order. Rerunning with the same output
+file skips IDs that already have a successful result.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import IO, Any, Iterator
+
+from task.clients.base import BaseClient
+from task.clients.factory import CLIENT_KINDS, create_client
+from task.clients.ratelimit import TokenBucket
+from task.clients.retry import RetryPolicy, with_retries
+from task.constants import DIAL_ENDPOINT
+from task.models.message import Message
+from task.models.role import Role
+
+
+@dataclass
+class BatchSettings:
+    concurrency: int = 8
+    requests_per_second: float | None = None
+    tokens_per_minute: float | None = None
+    stream: bool = False
+    retry_policy: RetryPolicy = field(default_factory=RetryPolicy)
+
+
+@dataclass
+class BatchStats:
+    completed: int = 0
+    failed: int = 0
+    skipped: int = 0
+
+
+def load_completed_ids(path: str) -> set[str]:
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # last line may be cut off by a crash, its request is simply run again
+                continue
+            if "error" not in record:
+                completed.add(str(record["id"]))
+    return completed
+
+
+class BatchRunner:
+
+    def __init__(self, client: BaseClient, settings: BatchSettings):
+        self._client = client
+        self._settings = settings
+        self._request_bucket = (
+            TokenBucket(settings.requests_per_second) if settings.requests_per_second else None
+        )
+        self._token_bucket = (
+            TokenBucket(settings.tokens_per_minute / 60, settings.tokens_per_minute)
+            if settings.tokens_per_minute else None
+        )
+
+    async def run(self, input_path: str, output_path: str) -> BatchStats:
+        stats = BatchStats()
+        completed_ids = load_completed_ids(output_path)
+        # bounded queue keeps only a few lines in memory no matter how large the input is
+        queue: asyncio.Queue[tuple[Any, list[Message] | None, str | None] | None] = asyncio.Queue(self._settings.concurrency * 2)
+
+        with open(output_path, "a+", encoding="utf-8") as output:
+            self._repair_tail(output)
+            async with asyncio.TaskGroup() as group:
+                group.create_task(self._produce(input_path, completed_ids, queue, stats))
+                for _ in range(self._settings.concurrency):
+                    group.create_task(self._work(queue, output, stats))
+        return stats
+
+    async def _produce(
+            self,
+            input_path: str,
+            completed_ids: set[str],
+            queue: asyncio.Queue,
+            stats: BatchStats,
+    ) -> None:
+        for request_id, messages, error in self._read_requests(input_path):
+            if str(request_id) in completed_ids:
+                stats.skipped += 1
+                continue
+            await queue.put((request_id, messages, error))
+        for _ in range(self._settings.concurrency):
+            await queue.put(None)
+
+    async def _work(self, queue: asyncio.Queue, output: IO[str], stats: BatchStats) -> None:
+        while (item := await queue.get()) is not None:
+            request_id, messages, error = item
+            if error is not None:
+                record = {"id": request_id, "error": error, "status_code": None}
+            else:
+                record = await self._complete(request_id, messages)
+            if "error" in record:
+                stats.failed += 1
+            else:
+                stats.completed += 1
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+
+    async def _complete(self, request_id: Any, messages: list[Message]) -> dict[str, Any]:
+        tokens = sum(msg.estimate_tokens() for msg in messages)
+        try:
+            response = await with_retries(lambda: self._call(messages, tokens), self._settings.retry_policy)
+        except Exception as error:
+            return {"id": request_id, "error": str(error), "status_code": getattr(error, "status_code", None)}
+        return {"id": request_id, "content": response.content}
+
+    async def _call(self, messages: list[Message], tokens: int) -> Message:
+        # every attempt, retries included, goes through the rate limits
+        if self._request_bucket:
+            await self._request_bucket.acquire()
+        if self._token_bucket:
+            await self._token_bucket.acquire(tokens)
+
+        if self._settings.stream:
+            return await self._client.stream_completion(messages, sinks=[])
+        return await self._client.aget_completion(messages)
+
+    @staticmethod
+    def _read_requests(input_path: str) -> Iterator[tuple[Any, list[Message] | None, str | None]]:
+        """
+        Yield `(id, messages, None)` per request line, or `(id, None, error)` for a line that cannot be parsed.
+        """
+        with open(input_path, encoding="utf-8") as file:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                request_id = line_number
+                try:
+                    request = json.loads(line)
+                    request_id = request.get("id", line_number)
+                    messages = [Message(Role(msg["role"]), msg["content"]) for msg in request["messages"]]
+                except (ValueError, KeyError, TypeError, AttributeError) as error:
+                    # one bad line is reported in the output instead of stopping the whole run
+                    yield request_id, None, f"Invalid request on line {line_number}: {error!r}"
+                    continue
+                yield request_id, messages, None
+
+    @staticmethod
+    def _repair_tail(output: IO[str]) -> None:
+        # a run killed mid-write leaves a line without newline, next record must not be glued to it
+        output.seek(0, os.SEEK_END)
+        if output.tell() == 0:
+            return
+        output.seek(output.tell() - 1)
+        if output.read(1) != "\n":
+            output.write("\n")
+
+
+async def _main(args: argparse.Namespace) -> BatchStats:
+    settings = BatchSettings(
+        concurrency=args.concurrency,
+        requests_per_second=args.rps,
+        tokens_per_minute=args.tpm,
+        stream=args.stream,
+        retry_policy=RetryPolicy(max_retries=args.max_retries),
+    )
+    # retries are made by the runner, where they go through the rate limits
+    client = create_client(args.client, args.deployment, args.endpoint, args.cache, sdk_retries=0)
+    async with client:
+        return await BatchRunner(client, settings).run(args.input, args.output)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--client", choices=CLIENT_KINDS, default="dial")
+    parser.add_argument("--deployment", default="gpt-4o")
+    parser.add_argument("--endpoint", default=DIAL_ENDPOINT)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rps", type=float, default=None, help="requests per second limit")
+    parser.add_argument("--tpm", type=float, default=None, help="estimated prompt tokens per minute limit")
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--stream", action="store_true", help="use streaming completions")
+    parser.add_argument("--cache", default=None, help="sqlite file to cache responses of repeated prompts in")
+    args = parser.parse_args()
+
+    stats = asyncio.run(_main(args))
+    print(f"completed: {stats.completed}, failed: {stats.failed}, skipped: {stats.skipped}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
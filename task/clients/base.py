@@ -1,17 +1,32 @@
 from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator
 
+from task.clients.events import DeltaEvent
+from task.clients.metrics import ClientHooks, RequestTrace
+from task.clients.sinks import MessageAssembler, Sink, TerminalSink, pipe
 from task.constants import API_KEY
 from task.models.message import Message
 
 
 class BaseClient(ABC):
 
-    def __init__(self, deployment_name: str):
+    def __init__(self, deployment_name: str, params: dict[str, Any] | None = None):
         api_key = API_KEY
         if not api_key or api_key.strip() == "":
             raise ValueError("API key cannot be null or empty")
         self._api_key = api_key
         self._deployment_name= deployment_name
+        # sampling parameters sent with every request, e.g. temperature, top_p, max_tokens, seed
+        self._params = dict(params or {})
+        self._hooks: tuple[ClientHooks, ...] = ()
+
+    @property
+    def deployment_name(self) -> str:
+        return self._deployment_name
+
+    @property
+    def params(self) -> dict[str, Any]:
+        return self._params
 
     @abstractmethod
     def get_completion(self, messages: list[Message]) -> Message:
@@ -21,8 +36,50 @@ class BaseClient(ABC):
         ...
 
     @abstractmethod
-    async def stream_completion(self, messages: list[Message]) -> Message:
+    async def aget_completion(self, messages: list[Message]) -> Message:
+        """
+        Send asynchronous non-streaming request to DIAL API and return AI response.
+        """
+        ...
+
+    async def stream_completion(self, messages: list[Message], sinks: list[Sink] | None = None) -> Message:
         """
-        Send asynchronous streaming request to DIAL API and return AI response.
+        Send asynchronous streaming request to DIAL API, pass every event to `sinks` and return the response.
+        By default the response is printed to the terminal as it arrives.
         """
-        ...
\ No newline at end of file
+        assembler = MessageAssembler()
+        await pipe(self.stream_events(messages), assembler, *(sinks if sinks is not None else [TerminalSink()]))
+        return assembler.message
+
+    @abstractmethod
+    def stream_events(self, messages: list[Message]) -> AsyncIterator[DeltaEvent]:
+        """
+        Send asynchronous streaming request to DIAL API and yield role, content, finish reason and usage
+        events as they arrive. Closing the iterator early releases the underlying connection.
+        """
+        ...
+
+    def add_hooks(self, *hooks: ClientHooks) -> None:
+        """
+        Register instrumentation hooks called on request start, first byte, every chunk, completion, error
+        and cancellation.
+        """
+        self._hooks = (*self._hooks, *hooks)
+
+    def _start_trace(self, stream: bool) -> RequestTrace | None:
+        # without hooks no trace is created and clients skip all timing work
+        if not self._hooks:
+            return None
+        return RequestTrace(self._deployment_name, stream, self._hooks)
+
+    async def close(self) -> None:
+        """
+        Release connections held by the client. Client must not be used afterwards.
+        """
+        ...
+
+    async def __aenter__(self) -> "BaseClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
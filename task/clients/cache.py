@@ -0,0 +1,298 @@
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Iterator
+
+from task.clients.base import BaseClient
+from task.clients.events import ContentDelta, DeltaEvent, FinishDelta, RoleDelta, UsageDelta
+from task.clients.sinks import MessageAssembler, pipe
+from task.models.message import Message
+from task.models.role import Role
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+def cache_key(deployment_name: str, params: dict[str, Any], messages: list[Message]) -> str:
+    digest = hashlib.sha256()
+    digest.update(json.dumps([deployment_name, params], sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    # messages are hashed from their cached JSON, so long histories are not serialized again
+    for msg in messages:
+        digest.update(b"\n")
+        digest.update(msg.to_json().encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache of completion contents: bounded in-memory LRU in front of an optional sqlite file.
+    Memory tier evicts least recently used entries once `max_bytes` is exceeded; entries of both
+    tiers expire after `ttl` seconds and are purged on open and then every `purge_interval` seconds of writes.
+    Safe to use from several threads; async code should use `aget`/`aput`, which keep sqlite off the event loop.
+    """
+
+    def __init__(
+            self,
+            max_bytes: int = 64 * 1024 * 1024,
+            ttl: float | None = 24 * 3600,
+            path: str | None = None,
+            purge_interval: float = 3600.0,
+    ):
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._purge_interval = purge_interval
+        self._purged_at = time.time()
+        self._entries: OrderedDict[str, tuple[str, float | None, int]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self.stats = CacheStats()
+
+        self._db: sqlite3.Connection | None = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, content TEXT NOT NULL, expires_at REAL)"
+            )
+            self.purge_expired()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        content = self._get_memory(key, now)
+        if content is None:
+            content = self._get_disk(key, now)
+        if content is None:
+            self.stats.misses += 1
+        return content
+
+    async def aget(self, key: str) -> str | None:
+        """
+        Same as `get`, but the sqlite lookup runs in a worker thread instead of blocking the event loop.
+        """
+        now = time.time()
+        content = self._get_memory(key, now)
+        if content is None and self._db is not None:
+            content = await asyncio.to_thread(self._get_disk, key, now)
+        if content is None:
+            self.stats.misses += 1
+        return content
+
+    def put(self, key: str, content: str) -> None:
+        expires_at = self._expires_at()
+        with self._lock:
+            self._store(key, content, expires_at)
+        self._put_disk(key, content, expires_at)
+        if self._purge_due():
+            self.purge_expired()
+
+    async def aput(self, key: str, content: str) -> None:
+        expires_at = self._expires_at()
+        with self._lock:
+            self._store(key, content, expires_at)
+        if self._db is not None:
+            await asyncio.to_thread(self._put_disk, key, content, expires_at)
+        if self._purge_due():
+            await asyncio.to_thread(self.purge_expired)
+
+    def purge_expired(self) -> None:
+        now = time.time()
+        with self._lock:
+            expired = [
+                key for key, (_, expires_at, _) in self._entries.items()
+                if expires_at is not None and expires_at <= now
+            ]
+            for key in expired:
+                self._remove(key)
+            self.stats.expirations += len(expired)
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _purge_due(self) -> bool:
+        # reads only skip expired rows, without purging the sqlite file would grow with every new prompt
+        if self._ttl is None:
+            return False
+        now = time.time()
+        with self._lock:
+            if now - self._purged_at < self._purge_interval:
+                return False
+            self._purged_at = now
+            return True
+
+    def _expires_at(self) -> float | None:
+        return time.time() + self._ttl if self._ttl is not None else None
+
+    def _get_memory(self, key: str, now: float) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            content, expires_at, _ = entry
+            if expires_at is None or expires_at > now:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return content
+            self._remove(key)
+            self.stats.expirations += 1
+            return None
+
+    def _get_disk(self, key: str, now: float) -> str | None:
+        # the disk tier has its own lock, so memory hits never wait for sqlite
+        with self._db_lock:
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT content, expires_at FROM responses WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now),
+            ).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self._store(key, row[0], row[1])
+            self.stats.disk_hits += 1
+        return row[0]
+
+    def _put_disk(self, key: str, content: str, expires_at: float | None) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, content, expires_at) VALUES (?, ?, ?)",
+                    (key, content, expires_at),
+                )
+
+    def _store(self, key: str, content: str, expires_at: float | None) -> None:
+        if key in self._entries:
+            self._remove(key)
+        size = sys.getsizeof(content)
+        if size > self._max_bytes:
+            return
+        self._entries[key] = (content, expires_at, size)
+        self._size += size
+        while self._size > self._max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._size -= size
+
+
+class CachedClient(BaseClient):
+    """
+    Serves repeated requests of the wrapped client from `ResponseCache`.
+    Streaming hits are replayed chunk by chunk with the original finish reason and usage, so output looks
+    the same as for a real stream. Only answers that finished with `stop` are cached; asynchronous misses
+    are therefore fetched as streams, and blocking `get_completion` reads the cache but never writes to it,
+    as a non-streaming answer does not tell why it ended. Closing the client closes the cache too.
+    """
+
+    def __init__(self, client: BaseClient, cache: ResponseCache):
+        super().__init__(client.deployment_name, client.params)
+        self._client = client
+        self._cache = cache
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
+
+    def get_completion(self, messages: list[Message]) -> Message:
+        entry = _decode_entry(self._cache.get(cache_key(self._deployment_name, self._params, messages)))
+        if entry is not None:
+            return Message(Role.AI, entry.content)
+        return self._client.get_completion(messages)
+
+    async def aget_completion(self, messages: list[Message]) -> Message:
+        key = cache_key(self._deployment_name, self._params, messages)
+        entry = _decode_entry(await self._cache.aget(key))
+        if entry is not None:
+            return Message(Role.AI, entry.content)
+
+        assembler = MessageAssembler()
+        await pipe(self._client.stream_events(messages), assembler)
+        if assembler.finish_reason == _COMPLETE:
+            await self._cache.aput(key, _encode_entry(assembler.message.content, _COMPLETE, assembler.usage))
+        return assembler.message
+
+    async def stream_events(self, messages: list[Message]) -> AsyncIterator[DeltaEvent]:
+        key = cache_key(self._deployment_name, self._params, messages)
+        entry = _decode_entry(await self._cache.aget(key))
+        if entry is not None:
+            yield RoleDelta(Role.AI)
+            for snippet in _replay_chunks(entry.content):
+                yield ContentDelta(snippet)
+                await asyncio.sleep(0)
+            yield FinishDelta(entry.finish_reason)
+            if entry.usage is not None:
+                yield entry.usage
+            return
+
+        assembler = MessageAssembler()
+        # closed right away when the caller stops early, so the upstream connection is released
+        async with aclosing(self._client.stream_events(messages)) as events:
+            async for event in events:
+                await assembler.send(event)
+                yield event
+        # interrupted streams leave nothing behind, answers cut by length or content filter are not cached
+        if assembler.finish_reason == _COMPLETE:
+            await self._cache.aput(key, _encode_entry(assembler.message.content, _COMPLETE, assembler.usage))
+
+    async def close(self) -> None:
+        await self._client.close()
+        self._cache.close()
+
+
+_COMPLETE = "stop"
+
+
+@dataclass
+class _CacheEntry:
+    content: str
+    finish_reason: str
+    usage: UsageDelta | None
+
+
+def _encode_entry(content: str, finish_reason: str, usage: UsageDelta | None) -> str:
+    return json.dumps(
+        {"content": content, "finish_reason": finish_reason, "usage": None if usage is None else asdict(usage)},
+        ensure_ascii=False,
+    )
+
+
+def _decode_entry(value: str | None) -> _CacheEntry | None:
+    if value is None:
+        return None
+    entry = json.loads(value)
+    usage = entry.get("usage")
+    return _CacheEntry(entry["content"], entry["finish_reason"], None if usage is None else UsageDelta(**usage))
+
+
+_WORD = re.compile(r"\S*\s*")
+
+
+def _replay_chunks(content: str) -> Iterator[str]:
+    # word-sized pieces resemble the token deltas of a real stream
+    for match in _WORD.finditer(content):
+        if match.group():
+            yield match.group()
@@ -1,6 +1,11 @@
+from typing import Any, AsyncIterator
+
 from aidial_client import Dial, AsyncDial
 
 from task.clients.base import BaseClient
+from task.clients.events import ContentDelta, DeltaEvent, FinishDelta, RoleDelta, UsageDelta
+from task.clients.metrics import report_failures
+from task.clients.pool import PoolSettings
 from task.constants import DIAL_ENDPOINT
 from task.models.message import Message
 from task.models.role import Role
@@ -8,38 +13,97 @@ from task.models.role import Role
 
 class DialClient(BaseClient):
 
-    def __init__(self, deployment_name: str):
-        super().__init__(deployment_name)
-        self._client = Dial(api_key=self._api_key, base_url=DIAL_ENDPOINT)
-        self._async_client = AsyncDial(api_key=self._api_key, base_url=DIAL_ENDPOINT)
+    def __init__(
+            self,
+            deployment_name: str,
+            endpoint: str = DIAL_ENDPOINT,
+            pool_settings: PoolSettings | None = None,
+            params: dict[str, Any] | None = None,
+            max_retries: int = 2,
+    ):
+        super().__init__(deployment_name, params)
+        # aidial-client keeps its own pooled httpx clients, only timeouts are taken from settings
+        timeout = (pool_settings or PoolSettings()).read_timeout
+        # pass 0 when the caller retries by itself, SDK retries are invisible to its rate limits and metrics
+        self._client = Dial(api_key=self._api_key, base_url=endpoint, timeout=timeout, max_retries=max_retries)
+        self._async_client = AsyncDial(
+            api_key=self._api_key, base_url=endpoint, timeout=timeout, max_retries=max_retries
+        )
 
     def get_completion(self, messages: list[Message]) -> Message:
-        completion = self._client.chat.completions.create(
-            deployment_name=self._deployment_name,
-            stream=False,
-            messages=[msg.to_dict() for msg in messages],
-        )
+        trace = self._start_trace(stream=False)
+        with report_failures(trace):
+            completion = self._client.chat.completions.create(
+                deployment_name=self._deployment_name,
+                stream=False,
+                messages=[msg.to_dict() for msg in messages],
+                **self._params,
+            )
+            if trace:
+                trace.first_byte()
 
-        if not completion.choices:
-            raise Exception("No choices in response found")
+            if not completion.choices:
+                raise Exception("No choices in response found")
 
         content = completion.choices[0].message.content
-        print(content)
+        if trace:
+            trace.complete(completion.usage.completion_tokens if completion.usage else None)
         return Message(Role.AI, content)
 
-    async def stream_completion(self, messages: list[Message]) -> Message:
-        chunks = await self._async_client.chat.completions.create(
-            deployment_name=self._deployment_name,
-            stream=True,
-            messages=[msg.to_dict() for msg in messages],
-        )
+    async def aget_completion(self, messages: list[Message]) -> Message:
+        trace = self._start_trace(stream=False)
+        with report_failures(trace):
+            completion = await self._async_client.chat.completions.create(
+                deployment_name=self._deployment_name,
+                stream=False,
+                messages=[msg.to_dict() for msg in messages],
+                **self._params,
+            )
+            if trace:
+                trace.first_byte()
+
+            if not completion.choices:
+                raise Exception("No choices in response found")
+
+        content = completion.choices[0].message.content
+        if trace:
+            trace.complete(completion.usage.completion_tokens if completion.usage else None)
+        return Message(Role.AI, content)
+
+    async def stream_events(self, messages: list[Message]) -> AsyncIterator[DeltaEvent]:
+        trace = self._start_trace(stream=True)
+        usage = None
+        with report_failures(trace):
+            chunks = await self._async_client.chat.completions.create(
+                deployment_name=self._deployment_name,
+                stream=True,
+                messages=[msg.to_dict() for msg in messages],
+                **self._params,
+            )
+            if trace:
+                trace.first_byte()
+
+            try:
+                async for chunk in chunks:
+                    if chunk.choices:
+                        choice = chunk.choices[0]
+                        if choice.delta.role:
+                            yield RoleDelta(Role(choice.delta.role))
+                        if choice.delta.content:
+                            if trace:
+                                trace.chunk()
+                            yield ContentDelta(choice.delta.content)
+                        if choice.finish_reason:
+                            yield FinishDelta(choice.finish_reason)
+                    if chunk.usage:
+                        usage = chunk.usage
+                        yield UsageDelta(usage.prompt_tokens, usage.completion_tokens, usage.total_tokens)
+            finally:
+                await chunks.aclose()
 
-        contents = []
-        async for chunk in chunks:
-            if chunk.choices and chunk.choices[0].delta.content:
-                snippet = chunk.choices[0].delta.content
-                print(snippet, end="", flush=True)
-                contents.append(snippet)
+        if trace:
+            trace.complete(usage.completion_tokens if usage else None)
 
-        print()
-        return Message(Role.AI, "".join(contents))
+    async def close(self) -> None:
+        self._client._http_client.internal_http_client.close()
+        await self._async_client._http_client.internal_http_client.aclose()
@@ -0,0 +1,128 @@
+import asyncio
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from task.clients.base import BaseClient
+from task.clients.cache import cache_key
+from task.clients.events import DeltaEvent
+from task.clients.sinks import Sink, pipe
+from task.models.message import Message
+
+
+@dataclass
+class CoalesceStats:
+    upstream: int = 0
+    coalesced: int = 0
+
+
+class _Flight(Sink):
+    """
+    Events of one upstream stream, kept so that requests joining late replay them from the start.
+    """
+
+    def __init__(self):
+        self.events: list[DeltaEvent] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.waiters = 0
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    async def send(self, event: DeltaEvent) -> None:
+        self.events.append(event)
+        self._notify()
+
+    async def close(self) -> None:
+        self.done = True
+        self._notify()
+
+    def fail(self, error: BaseException) -> None:
+        self.error = error
+        self.done = True
+        self._notify()
+
+    def _notify(self) -> None:
+        # every waiter holds the current event, a fresh one is armed for the next change
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def __aiter__(self) -> AsyncIterator[DeltaEvent]:
+        index = 0
+        while True:
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.done:
+                break
+            await self._changed.wait()
+        if self.error is not None:
+            raise self.error
+
+
+class CoalescingClient(BaseClient):
+    """
+    Shares one upstream call of the wrapped client between identical requests in flight at the same time,
+    i.e. with the same deployment, parameters and messages. Every waiter of a stream gets all of its events,
+    also when it joins late; the upstream call is cancelled once no waiter is left. Identical requests
+    made after a call has finished start a new one, wrap a `CachedClient` to reuse finished responses.
+    """
+
+    def __init__(self, client: BaseClient):
+        super().__init__(client.deployment_name, client.params)
+        self._client = client
+        self._streams: dict[str, _Flight] = {}
+        self._completions: dict[str, asyncio.Task] = {}
+        self.stats = CoalesceStats()
+
+    def get_completion(self, messages: list[Message]) -> Message:
+        # blocking calls cannot wait on each other, they go straight to the wrapped client
+        return self._client.get_completion(messages)
+
+    async def aget_completion(self, messages: list[Message]) -> Message:
+        key = cache_key(self._deployment_name, self._params, messages)
+        task = self._completions.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._client.aget_completion(messages))
+            self._completions[key] = task
+            task.add_done_callback(lambda _: self._completions.pop(key, None))
+            self.stats.upstream += 1
+        else:
+            self.stats.coalesced += 1
+        # one waiter giving up must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def stream_events(self, messages: list[Message]) -> AsyncIterator[DeltaEvent]:
+        key = cache_key(self._deployment_name, self._params, messages)
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._streams[key] = flight
+            flight.task = asyncio.create_task(self._run(key, flight, messages))
+            self.stats.upstream += 1
+        else:
+            self.stats.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            async for event in flight:
+                yield event
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                flight.task.cancel()
+                # requests arriving while the cancellation is pending must not join the dead stream
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+
+    async def close(self) -> None:
+        await self._client.close()
+
+    async def _run(self, key: str, flight: _Flight, messages: list[Message]) -> None:
+        try:
+            await pipe(self._client.stream_events(messages), flight)
+        except Exception as error:
+            flight.fail(error)
+        finally:
+            # a finished stream is not joined anymore, later requests start a new one
+            if self._streams.get(key) is flight:
+                del self._streams[key]
@@ -1,8 +1,14 @@
 import json
+from typing import Any, AsyncIterator
+
 import aiohttp
-import requests
 
 from task.clients.base import BaseClient
+from task.clients.errors import DialHTTPError, parse_retry_after
+from task.clients.events import ContentDelta, DeltaEvent, FinishDelta, RoleDelta, UsageDelta
+from task.clients.metrics import report_failures
+from task.clients.pool import PoolSettings, create_async_session, create_session
+from task.clients.sse import DONE, SSEDecoder, ServerSentEvent, parse_delta
 from task.constants import DIAL_ENDPOINT
 from task.models.message import Message
 from task.models.role import Role
@@ -10,62 +16,132 @@ from task.models.role import Role
 
 class CustomDialClient(BaseClient):
 
-    def __init__(self, deployment_name: str):
-        super().__init__(deployment_name)
-        self._endpoint = DIAL_ENDPOINT + f"/openai/deployments/{deployment_name}/chat/completions"
-
-    def get_completion(self, messages: list[Message]) -> Message:
-        headers = {
+    def __init__(
+            self,
+            deployment_name: str,
+            endpoint: str = DIAL_ENDPOINT,
+            pool_settings: PoolSettings | None = None,
+            params: dict[str, Any] | None = None,
+    ):
+        super().__init__(deployment_name, params)
+        self._endpoint = endpoint + f"/openai/deployments/{deployment_name}/chat/completions"
+        self._headers = {
             "api-key": self._api_key,
             "Content-Type": "application/json",
         }
-        request_data = {
-            "messages": [msg.to_dict() for msg in messages],
-        }
+        self._pool_settings = pool_settings or PoolSettings()
+        self._session = create_session(self._pool_settings)
+        # aiohttp session is bound to the event loop, so it is created lazily on first use
+        self._async_session: aiohttp.ClientSession | None = None
 
-        response = requests.post(self._endpoint, headers=headers, json=request_data)
+    def _get_async_session(self) -> aiohttp.ClientSession:
+        if self._async_session is None or self._async_session.closed:
+            self._async_session = create_async_session(self._pool_settings)
+        return self._async_session
 
-        if response.status_code != 200:
-            raise Exception(f"HTTP {response.status_code}: {response.text}")
+    def get_completion(self, messages: list[Message]) -> Message:
+        request_data = self._encode_request(messages, stream=False)
 
-        data = response.json()
-        content = data["choices"][0]["message"]["content"]
-        print(content)
+        trace = self._start_trace(stream=False)
+        with report_failures(trace):
+            response = self._session.post(
+                self._endpoint,
+                headers=self._headers,
+                data=request_data,
+                timeout=self._pool_settings.requests_timeout,
+            )
+            if trace:
+                trace.first_byte()
+
+            if response.status_code != 200:
+                raise DialHTTPError(
+                    response.status_code,
+                    response.text,
+                    parse_retry_after(response.headers.get("Retry-After")),
+                )
+
+            data = response.json()
+            content = data["choices"][0]["message"]["content"]
+
+        if trace:
+            trace.complete((data.get("usage") or {}).get("completion_tokens"))
         return Message(Role.AI, content)
 
-    async def stream_completion(self, messages: list[Message]) -> Message:
-        headers = {
-            "api-key": self._api_key,
-            "Content-Type": "application/json",
-        }
-        request_data = {
-            "stream": True,
-            "messages": [msg.to_dict() for msg in messages],
-        }
+    async def aget_completion(self, messages: list[Message]) -> Message:
+        request_data = self._encode_request(messages, stream=False)
 
-        contents = []
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self._endpoint, json=request_data, headers=headers) as response:
-                async for line in response.content:
-                    decoded = line.decode("utf-8").strip()
-                    if not decoded or not decoded.startswith("data: "):
+        trace = self._start_trace(stream=False)
+        with report_failures(trace):
+            session = self._get_async_session()
+            async with session.post(self._endpoint, data=request_data, headers=self._headers) as response:
+                if trace:
+                    trace.first_byte()
+                await self._raise_for_status(response)
+                data = await response.json()
+            content = data["choices"][0]["message"]["content"]
+
+        if trace:
+            trace.complete((data.get("usage") or {}).get("completion_tokens"))
+        return Message(Role.AI, content)
+
+    async def stream_events(self, messages: list[Message]) -> AsyncIterator[DeltaEvent]:
+        request_data = self._encode_request(messages, stream=True)
+
+        usage = None
+        trace = self._start_trace(stream=True)
+        with report_failures(trace):
+            session = self._get_async_session()
+            async with session.post(self._endpoint, data=request_data, headers=self._headers) as response:
+                if trace:
+                    trace.first_byte()
+                await self._raise_for_status(response)
+
+                async for event in self._read_events(response):
+                    if event.data == DONE:
                         continue
+                    delta = parse_delta(event.data)
+                    if delta.role:
+                        yield RoleDelta(Role(delta.role))
+                    if delta.content:
+                        if trace:
+                            trace.chunk()
+                        yield ContentDelta(delta.content)
+                    if delta.finish_reason:
+                        yield FinishDelta(delta.finish_reason)
+                    if delta.usage:
+                        usage = delta.usage
+                        yield UsageDelta.from_dict(usage)
 
-                    payload = decoded[6:]
-                    if payload == "[DONE]":
-                        break
+        if trace:
+            trace.complete(usage.get("completion_tokens") if usage else None)
 
-                    snippet = self._get_content_snippet(payload)
-                    if snippet:
-                        print(snippet, end="", flush=True)
-                        contents.append(snippet)
+    async def close(self) -> None:
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+        self._async_session = None
+        self._session.close()
 
-        print()
-        return Message(Role.AI, "".join(contents))
+    def _encode_request(self, messages: list[Message], stream: bool) -> bytes:
+        # messages cache their own JSON, so only the envelope is serialized on every turn
+        envelope = json.dumps({**self._params, "stream": stream}, ensure_ascii=False)
+        body = f'{envelope[:-1]},"messages":[{",".join(msg.to_json() for msg in messages)}]}}'
+        return body.encode("utf-8")
 
     @staticmethod
-    def _get_content_snippet(payload: str) -> str | None:
-        chunk = json.loads(payload)
-        delta = chunk["choices"][0].get("delta", {})
-        return delta.get("content")
+    async def _raise_for_status(response: aiohttp.ClientResponse) -> None:
+        if response.status != 200:
+            raise DialHTTPError(
+                response.status,
+                await response.text(),
+                parse_retry_after(response.headers.get("Retry-After")),
+            )
 
+    @staticmethod
+    async def _read_events(response: aiohttp.ClientResponse) -> AsyncIterator[ServerSentEvent]:
+        decoder = SSEDecoder()
+        # the stream is read up to EOF even after [DONE], so the connection goes back to the pool
+        async for data in response.content.iter_any():
+            for event in decoder.feed(data):
+                yield event
+        for event in decoder.flush():
+            yield event
@@ -0,0 +1,26 @@
+import time
+from email.utils import parsedate_to_datetime
+
+
+class DialHTTPError(Exception):
+
+    def __init__(self, status_code: int, body: str, retry_after: float | None = None):
+        super().__init__(f"HTTP {status_code}: {body}")
+        self.status_code = status_code
+        self.body = body
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Convert `Retry-After` header (delay in seconds or HTTP date) to seconds to wait.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.replace(".", "", 1).isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from typing import Any
+
+from task.models.role import Role
+
+
+@dataclass(frozen=True, slots=True)
+class RoleDelta:
+    role: Role
+
+
+@dataclass(frozen=True, slots=True)
+class ContentDelta:
+    content: str
+
+
+@dataclass(frozen=True, slots=True)
+class FinishDelta:
+    finish_reason: str
+
+
+@dataclass(frozen=True, slots=True)
+class UsageDelta:
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    total_tokens: int | None = None
+
+    @classmethod
+    def from_dict(cls, usage: dict[str, Any]) -> "UsageDelta":
+        return cls(usage.get("prompt_tokens"), usage.get("completion_tokens"), usage.get("total_tokens"))
+
+
+# Every event yielded by `BaseClient.stream_events`
+DeltaEvent = RoleDelta | ContentDelta | FinishDelta | UsageDelta
+
+
+def to_dict(event: DeltaEvent) -> dict[str, Any]:
+    """
+    JSON-friendly form of an event, tagged with its `type`.
+    """
+    if isinstance(event, ContentDelta):
+        return {"type": "content", "content": event.content}
+    if isinstance(event, RoleDelta):
+        return {"type": "role", "role": event.role.value}
+    if isinstance(event, FinishDelta):
+        return {"type": "finish", "finish_reason": event.finish_reason}
+    return {
+        "type": "usage",
+        "prompt_tokens": event.prompt_tokens,
+        "completion_tokens": event.completion_tokens,
+        "total_tokens": event.total_tokens,
+    }
@@ -0,0 +1,30 @@
+from task.clients.base import BaseClient
+from task.clients.cache import CachedClient, ResponseCache
+from task.clients.client import DialClient
+from task.clients.custom_client import CustomDialClient
+from task.constants import DIAL_ENDPOINT
+
+CLIENT_KINDS = ("dial", "custom")
+
+
+def create_client(
+        kind: str,
+        deployment_name: str,
+        endpoint: str = DIAL_ENDPOINT,
+        cache_path: str | None = None,
+        sdk_retries: int = 2,
+) -> BaseClient:
+    """
+    Client selected on the command line: `dial` is based on aidial-client, `custom` on plain HTTP.
+    With `cache_path` responses of repeated prompts are served from an sqlite cache. `sdk_retries` are the
+    retries made inside aidial-client, pass 0 when the caller retries on its own.
+    """
+    if kind == "custom":
+        client = CustomDialClient(deployment_name, endpoint=endpoint)
+    elif kind == "dial":
+        client = DialClient(deployment_name, endpoint=endpoint, max_retries=sdk_retries)
+    else:
+        raise ValueError(f"Unknown client kind: {kind}")
+    if cache_path:
+        return CachedClient(client, ResponseCache(path=cache_path))
+    return client
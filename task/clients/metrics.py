@@ -0,0 +1,266 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Iterator
+
+# Upper bounds of histogram buckets in seconds, the last bucket is implicit +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+GAP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+THROUGHPUT_BUCKETS = (1, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram: observing a value is one binary search and two additions.
+    """
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float | None:
+        """
+        Upper bound of the bucket holding the `q` quantile, `inf` if it is beyond the last bucket.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        return {
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+
+class ClientHooks:
+    """
+    Base class of client instrumentation hooks, every method is a no-op unless overridden.
+    """
+
+    def on_request_start(self, trace: "RequestTrace") -> None:
+        ...
+
+    def on_first_byte(self, trace: "RequestTrace") -> None:
+        ...
+
+    def on_chunk(self, trace: "RequestTrace", gap: float) -> None:
+        ...
+
+    def on_complete(self, trace: "RequestTrace") -> None:
+        ...
+
+    def on_error(self, trace: "RequestTrace", error: BaseException) -> None:
+        ...
+
+    def on_cancel(self, trace: "RequestTrace") -> None:
+        ...
+
+
+class RequestTrace:
+    """
+    Timings of a single request, passed to every hook.
+    Clients create it only when hooks are registered, so disabled instrumentation costs one `if` per chunk.
+    """
+
+    __slots__ = ("deployment_name", "stream", "started_at", "first_byte_at", "first_token_at",
+                 "last_chunk_at", "finished_at", "chunks", "tokens", "_hooks")
+
+    def __init__(self, deployment_name: str, stream: bool, hooks: tuple[ClientHooks, ...]):
+        self.deployment_name = deployment_name
+        self.stream = stream
+        self.started_at = time.perf_counter()
+        self.first_byte_at: float | None = None
+        self.first_token_at: float | None = None
+        self.last_chunk_at: float | None = None
+        self.finished_at: float | None = None
+        self.chunks = 0
+        self.tokens = 0
+        self._hooks = hooks
+        for hook in hooks:
+            hook.on_request_start(self)
+
+    @property
+    def ttft(self) -> float | None:
+        return None if self.first_token_at is None else self.first_token_at - self.started_at
+
+    @property
+    def duration(self) -> float | None:
+        return None if self.finished_at is None else self.finished_at - self.started_at
+
+    def first_byte(self) -> None:
+        if self.first_byte_at is None:
+            self.first_byte_at = time.perf_counter()
+            for hook in self._hooks:
+                hook.on_first_byte(self)
+
+    def chunk(self) -> None:
+        """
+        Register a content delta; the first one marks the time to first token.
+        """
+        if self.first_byte_at is None:
+            self.first_byte()
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = self.last_chunk_at = now
+        gap = now - self.last_chunk_at
+        self.last_chunk_at = now
+        self.chunks += 1
+        for hook in self._hooks:
+            hook.on_chunk(self, gap)
+
+    def complete(self, tokens: int | None = None) -> None:
+        """
+        Finish the trace; `tokens` is the completion token count from usage, chunk count is used otherwise.
+        """
+        self.finished_at = time.perf_counter()
+        self.tokens = tokens if tokens is not None else self.chunks
+        for hook in self._hooks:
+            hook.on_complete(self)
+
+    def error(self, error: BaseException) -> None:
+        self.finished_at = time.perf_counter()
+        for hook in self._hooks:
+            hook.on_error(self, error)
+
+    def cancel(self) -> None:
+        """
+        Finish the trace of a request abandoned by the caller: stream closed early or call cancelled.
+        """
+        self.finished_at = time.perf_counter()
+        self.tokens = self.chunks
+        for hook in self._hooks:
+            hook.on_cancel(self)
+
+
+@contextmanager
+def report_failures(trace: RequestTrace | None) -> Iterator[None]:
+    """
+    Finish `trace` as failed when the block raises an error, or as cancelled when it is left by
+    cancellation or by closing the stream early, e.g. by a hedging loser or a caller that went away.
+    """
+    if trace is None:
+        yield
+        return
+    try:
+        yield
+    except Exception as error:
+        trace.error(error)
+        raise
+    except BaseException:
+        trace.cancel()
+        raise
+
+
+class _DeploymentMetrics:
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.ttft = Histogram(LATENCY_BUCKETS)
+        self.inter_chunk_gap = Histogram(GAP_BUCKETS)
+        self.duration = Histogram(LATENCY_BUCKETS)
+        self.tokens_per_second = Histogram(THROUGHPUT_BUCKETS)
+
+
+class MetricsRecorder(ClientHooks):
+    """
+    Records per-deployment latency histograms: time to first token, gaps between chunks,
+    total duration and tokens per second. Cancelled requests are counted separately; their time
+    to first token, when it arrived, still goes into its histogram, so slow requests abandoned by hedging
+    or by callers are not missing from the tail. Time until cancellation says nothing about the request
+    and is left out of the duration.
+    Exported as a dict or in Prometheus text format.
+    """
+
+    def __init__(self, prefix: str = "dial_client"):
+        self._prefix = prefix
+        self._deployments: defaultdict[str, _DeploymentMetrics] = defaultdict(_DeploymentMetrics)
+        # blocking `get_completion` calls may report from several threads at once
+        self._lock = threading.Lock()
+
+    def on_request_start(self, trace: RequestTrace) -> None:
+        with self._lock:
+            self._deployments[trace.deployment_name].requests += 1
+
+    def on_chunk(self, trace: RequestTrace, gap: float) -> None:
+        # the first chunk gap is TTFT itself and would skew the gap distribution
+        if trace.chunks > 1:
+            with self._lock:
+                self._deployments[trace.deployment_name].inter_chunk_gap.observe(gap)
+
+    def on_complete(self, trace: RequestTrace) -> None:
+        with self._lock:
+            metrics = self._deployments[trace.deployment_name]
+            if trace.ttft is not None:
+                metrics.ttft.observe(trace.ttft)
+            metrics.duration.observe(trace.duration)
+            # throughput is measured over the generation phase, after the first token arrived
+            generation = trace.finished_at - (trace.first_token_at or trace.started_at)
+            if trace.stream and trace.tokens and generation > 0:
+                metrics.tokens_per_second.observe(trace.tokens / generation)
+
+    def on_error(self, trace: RequestTrace, error: BaseException) -> None:
+        with self._lock:
+            self._deployments[trace.deployment_name].errors += 1
+
+    def on_cancel(self, trace: RequestTrace) -> None:
+        with self._lock:
+            metrics = self._deployments[trace.deployment_name]
+            metrics.cancelled += 1
+            if trace.ttft is not None:
+                metrics.ttft.observe(trace.ttft)
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            return {
+                name: {
+                    "requests": metrics.requests,
+                    "errors": metrics.errors,
+                    "cancelled": metrics.cancelled,
+                    "ttft_seconds": metrics.ttft.snapshot(),
+                    "inter_chunk_gap_seconds": metrics.inter_chunk_gap.snapshot(),
+                    "duration_seconds": metrics.duration.snapshot(),
+                    "tokens_per_second": metrics.tokens_per_second.snapshot(),
+                }
+                for name, metrics in self._deployments.items()
+            }
+
+    def to_prometheus(self) -> str:
+        snapshot = self.snapshot()
+        lines = []
+        for counter in ("requests", "errors", "cancelled"):
+            name = f"{self._prefix}_{counter}_total"
+            lines.append(f"# TYPE {name} counter")
+            for deployment, metrics in snapshot.items():
+                lines.append(f'{name}{{deployment="{deployment}"}} {metrics[counter]}')
+
+        for histogram in ("ttft_seconds", "inter_chunk_gap_seconds", "duration_seconds", "tokens_per_second"):
+            name = f"{self._prefix}_{histogram}"
+            lines.append(f"# TYPE {name} histogram")
+            for deployment, metrics in snapshot.items():
+                data = metrics[histogram]
+                cumulative = 0
+                for bound, count in data["buckets"].items():
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{deployment="{deployment}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{deployment="{deployment}"}} {data["sum"]}')
+                lines.append(f'{name}_count{{deployment="{deployment}"}} {data["count"]}')
+        return "\n".join(lines) + "\n"
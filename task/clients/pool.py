@@ -0,0 +1,54 @@
+from dataclasses import dataclass
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    limit: int = 100
+    limit_per_host: int = 20
+    dns_cache_ttl: int = 300
+    keepalive_timeout: float = 30.0
+    connect_timeout: float = 10.0
+    read_timeout: float = 60.0
+    total_timeout: float | None = None
+
+    @property
+    def requests_timeout(self) -> tuple[float, float]:
+        return self.connect_timeout, self.read_timeout
+
+
+def create_session(settings: PoolSettings) -> requests.Session:
+    """
+    Create keep-alive `requests.Session` whose connection pool follows the given limits.
+    """
+    adapter = HTTPAdapter(
+        pool_connections=max(1, settings.limit // settings.limit_per_host),
+        pool_maxsize=settings.limit_per_host,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def create_async_session(settings: PoolSettings) -> aiohttp.ClientSession:
+    """
+    Create keep-alive `aiohttp.ClientSession` with pooled connector and DNS cache.
+    Must be called from within a running event loop.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=settings.limit,
+        limit_per_host=settings.limit_per_host,
+        use_dns_cache=True,
+        ttl_dns_cache=settings.dns_cache_ttl,
+        keepalive_timeout=settings.keepalive_timeout,
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=settings.total_timeout,
+        sock_connect=settings.connect_timeout,
+        sock_read=settings.read_timeout,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
@@ -0,0 +1,31 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Asynchronous token bucket: `rate` tokens are refilled per second up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        self._rate = rate
+        self._capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self._capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        # requests larger than the bucket would wait forever, they take the whole bucket instead
+        amount = min(amount, self._capacity)
+        # the lock keeps waiters in FIFO order, so large requests are not starved by small ones
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+                self._updated_at = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self._rate)
@@ -0,0 +1,43 @@
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Awaitable, Callable, TypeVar
+
+import aiohttp
+import requests
+
+T = TypeVar("T")
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_retries: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    def is_retryable(self, error: Exception) -> bool:
+        status_code = getattr(error, "status_code", None)
+        if status_code is not None:
+            return status_code in (408, 429) or status_code >= 500
+        return isinstance(error, (aiohttp.ClientConnectionError, requests.ConnectionError, asyncio.TimeoutError))
+
+    def delay(self, attempt: int, error: Exception) -> float:
+        """
+        Full-jitter exponential backoff, never shorter than the server `Retry-After`.
+        """
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            return max(backoff, retry_after)
+        return backoff
+
+
+async def with_retries(call: Callable[[], Awaitable[T]], policy: RetryPolicy) -> T:
+    attempt = 0
+    while True:
+        try:
+            return await call()
+        except Exception as error:
+            if attempt >= policy.max_retries or not policy.is_retryable(error):
+                raise
+            await asyncio.sleep(policy.delay(attempt, error))
+            attempt += 1
@@ -0,0 +1,115 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, TypeVar
+
+from task.clients.base import BaseClient
+from task.clients.events import ContentDelta, DeltaEvent
+from task.models.message import Message
+
+T = TypeVar("T")
+
+
+class HedgedClient(BaseClient):
+    """
+    Sends the same request to several deployments, returns the first successful answer and cancels the rest.
+    Clients are tried in the given order: the next one is started only when the previous ones have not
+    produced a first token (a complete answer for non-streaming calls) within `hedge_delay` seconds,
+    or right away once all started requests have failed.
+    """
+
+    def __init__(self, clients: list[BaseClient], hedge_delay: float = 0.5):
+        if not clients:
+            raise ValueError("At least one client is required")
+        super().__init__(clients[0].deployment_name, clients[0].params)
+        self._clients = clients
+        self._hedge_delay = hedge_delay
+
+    def get_completion(self, messages: list[Message]) -> Message:
+        # blocking calls cannot be raced, clients are only used as fallbacks one after another
+        error: Exception | None = None
+        for client in self._clients:
+            try:
+                return client.get_completion(messages)
+            except Exception as failure:
+                error = _chain(failure, error)
+        raise error
+
+    async def aget_completion(self, messages: list[Message]) -> Message:
+        _, response = await self._race([lambda client=client: client.aget_completion(messages)
+                                        for client in self._clients])
+        return response
+
+    async def stream_events(self, messages: list[Message]) -> AsyncIterator[DeltaEvent]:
+        streams = [client.stream_events(messages) for client in self._clients]
+        try:
+            winner, first = await self._race([lambda stream=stream: _read_first_content(stream) for stream in streams])
+            for index, stream in enumerate(streams):
+                if index != winner:
+                    await stream.aclose()
+
+            for event in first:
+                yield event
+            async for event in streams[winner]:
+                yield event
+        finally:
+            for stream in streams:
+                await stream.aclose()
+
+    async def close(self) -> None:
+        for client in self._clients:
+            await client.close()
+
+    async def _race(self, calls: list[Callable[[], Awaitable[T]]]) -> tuple[int, T]:
+        """
+        Run `calls` with hedging and return index and result of the first one to succeed.
+        """
+        pending: dict[asyncio.Task, int] = {}
+        launched = 0
+        error: BaseException | None = None
+
+        def launch() -> None:
+            nonlocal launched
+            pending[asyncio.ensure_future(calls[launched]())] = launched
+            launched += 1
+
+        launch()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self._hedge_delay if launched < len(calls) else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    launch()
+                    continue
+
+                for task in done:
+                    index = pending.pop(task)
+                    if task.exception() is None:
+                        return index, task.result()
+                    error = _chain(task.exception(), error)
+                # nothing left in flight, so the next backup does not wait for the hedge delay
+                if not pending and launched < len(calls):
+                    launch()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+def _chain(error: BaseException, previous: BaseException | None) -> BaseException:
+    # failures of earlier clients stay visible as the cause of the one finally raised
+    if previous is not None and error.__cause__ is None:
+        error.__cause__ = previous
+    return error
+
+
+async def _read_first_content(stream: AsyncIterator[DeltaEvent]) -> list[DeltaEvent]:
+    # role events come before any generated text, only the first content delta counts as an answer
+    events = []
+    async for event in stream:
+        events.append(event)
+        if isinstance(event, ContentDelta):
+            break
+    return events
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import sys
+from abc import ABC, abstractmethod
+from contextlib import aclosing
+from typing import AsyncIterator, TextIO
+
+from task.clients.events import ContentDelta, DeltaEvent, FinishDelta, RoleDelta, UsageDelta, to_dict
+from task.models.message import Message
+from task.models.role import Role
+
+
+class Sink(ABC):
+    """
+    Consumer of streamed delta events. `close` is called once after the last event, also when the stream fails.
+    """
+
+    @abstractmethod
+    async def send(self, event: DeltaEvent) -> None:
+        ...
+
+    async def close(self) -> None:
+        ...
+
+
+async def pipe(events: AsyncIterator[DeltaEvent], *sinks: Sink) -> None:
+    """
+    Pass every event to all `sinks` in order, then close them. A slow sink slows down reading of the stream.
+    """
+    try:
+        async with aclosing(events):
+            async for event in events:
+                for sink in sinks:
+                    await sink.send(event)
+    finally:
+        for sink in sinks:
+            await sink.close()
+
+
+class MessageAssembler(Sink):
+    """
+    Collects content deltas into the final `Message`, keeps finish reason and usage of the stream.
+    """
+
+    def __init__(self):
+        self.role = Role.AI
+        self.finish_reason: str | None = None
+        self.usage: UsageDelta | None = None
+        self._contents: list[str] = []
+
+    @property
+    def message(self) -> Message:
+        return Message(self.role, "".join(self._contents))
+
+    async def send(self, event: DeltaEvent) -> None:
+        if isinstance(event, ContentDelta):
+            self._contents.append(event.content)
+        elif isinstance(event, RoleDelta):
+            self.role = event.role
+        elif isinstance(event, FinishDelta):
+            self.finish_reason = event.finish_reason
+        else:
+            self.usage = event
+
+
+class TerminalSink(Sink):
+    """
+    Prints content as it arrives, coalescing deltas into one write per `flush_size` characters
+    or `flush_interval` seconds, whichever comes first. Ends the output with a newline.
+    """
+
+    def __init__(self, flush_interval: float = 0.05, flush_size: int = 256, stream: TextIO | None = None):
+        self._flush_interval = flush_interval
+        self._flush_size = flush_size
+        # resolved on every write by default, so redirected stdout is respected
+        self._stream = stream
+        self._buffer: list[str] = []
+        self._size = 0
+        self._timer: asyncio.TimerHandle | None = None
+
+    async def send(self, event: DeltaEvent) -> None:
+        if not isinstance(event, ContentDelta):
+            return
+        self._buffer.append(event.content)
+        self._size += len(event.content)
+        if self._size >= self._flush_size:
+            self._flush()
+        elif self._timer is None:
+            # a timer rather than a check on the next delta, so text is not held back while the stream stalls
+            self._timer = asyncio.get_running_loop().call_later(self._flush_interval, self._flush)
+
+    async def close(self) -> None:
+        self._buffer.append("\n")
+        self._flush()
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._buffer:
+            stream = self._stream or sys.stdout
+            stream.write("".join(self._buffer))
+            stream.flush()
+            self._buffer.clear()
+            self._size = 0
+
+
+class FileSink(Sink):
+    """
+    Writes response text to an open text file, relying on the file's own buffering; flushed on close.
+    """
+
+    def __init__(self, file: TextIO):
+        self._file = file
+
+    async def send(self, event: DeltaEvent) -> None:
+        if isinstance(event, ContentDelta):
+            self._file.write(event.content)
+
+    async def close(self) -> None:
+        self._file.flush()
+
+
+class JsonlSink(Sink):
+    """
+    Writes every event as a JSON line, e.g. `{"type": "content", "content": "Paris"}`; flushed on close.
+    """
+
+    def __init__(self, file: TextIO):
+        self._file = file
+
+    async def send(self, event: DeltaEvent) -> None:
+        self._file.write(json.dumps(to_dict(event), ensure_ascii=False) + "\n")
+
+    async def close(self) -> None:
+        self._file.flush()
+
+
+_CLOSED = object()
+
+
+class EventQueue(Sink):
+    """
+    Sink consumed as an async iterator, e.g. by another task. The queue is bounded: once `max_size`
+    events are waiting, `send` blocks until the consumer catches up.
+    """
+
+    def __init__(self, max_size: int = 64):
+        self._queue: asyncio.Queue = asyncio.Queue(max_size)
+
+    async def send(self, event: DeltaEvent) -> None:
+        await self._queue.put(event)
+
+    async def close(self) -> None:
+        await self._queue.put(_CLOSED)
+
+    async def __aiter__(self) -> AsyncIterator[DeltaEvent]:
+        while (event := await self._queue.get()) is not _CLOSED:
+            yield event
+
+
+class FanOut(Sink):
+    """
+    Delivers events to several sinks, each consumed by its own task from a bounded queue of `max_queue` events.
+    A slow sink does not hold the others back until its queue is full, then `send` waits for it.
+    The first error raised by a sink is re-raised from `send` or `close`; that sink gets no further events.
+    """
+
+    def __init__(self, sinks: list[Sink], max_queue: int = 64):
+        self._sinks = sinks
+        self._max_queue = max_queue
+        self._queues: list[asyncio.Queue] = []
+        self._tasks: list[asyncio.Task] = []
+        self._error: BaseException | None = None
+
+    async def send(self, event: DeltaEvent) -> None:
+        if not self._tasks:
+            self._start()
+        if self._error is not None:
+            raise self._error
+        for queue in self._queues:
+            await queue.put(event)
+
+    async def close(self) -> None:
+        if not self._tasks:
+            self._start()
+        for queue in self._queues:
+            await queue.put(_CLOSED)
+        await asyncio.gather(*self._tasks)
+        self._queues, self._tasks = [], []
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _start(self) -> None:
+        # tasks need a running loop, so they are started with the first event
+        self._queues = [asyncio.Queue(self._max_queue) for _ in self._sinks]
+        self._tasks = [asyncio.create_task(self._consume(sink, queue))
+                       for sink, queue in zip(self._sinks, self._queues)]
+
+    async def _consume(self, sink: Sink, queue: asyncio.Queue) -> None:
+        failed = False
+        while (event := await queue.get()) is not _CLOSED:
+            if failed:
+                # the queue is still drained, so the producer never blocks on a dead consumer
+                continue
+            try:
+                await sink.send(event)
+            except Exception as error:
+                failed = True
+                self._error = self._error or error
+        try:
+            await sink.close()
+        except Exception as error:
+            self._error = self._error or error
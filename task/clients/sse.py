@@ -0,0 +1,183 @@
+import json
+from dataclasses import dataclass
+from typing import Any
+
+DONE = "[DONE]"
+
+# searching for a single byte value is a plain memchr, much cheaper than a one-byte substring search
+_LF = 0x0A
+_CR = 0x0D
+
+
+@dataclass(slots=True)
+class ServerSentEvent:
+    data: str
+    event: str = "message"
+    id: str | None = None
+    retry: int | None = None
+
+
+@dataclass(slots=True)
+class ChunkDelta:
+    content: str | None = None
+    finish_reason: str | None = None
+    usage: dict[str, Any] | None = None
+    role: str | None = None
+
+
+class SSEDecoder:
+    """
+    Incremental decoder of `text/event-stream` bodies.
+    Bytes are fed as they arrive from the socket, pieces of a line are only kept until its
+    end arrives and only complete lines are decoded, so frames and UTF-8 characters
+    split across network chunks are handled transparently.
+    """
+
+    def __init__(self):
+        # pieces of the line in progress, joined once its end arrives
+        self._pending: list[bytes] = []
+        self._data: list[str] = []
+        self._event: str | None = None
+        self._last_id: str | None = None
+        self._retry: int | None = None
+        self._skip_lf = False
+
+    def feed(self, chunk: bytes) -> list[ServerSentEvent]:
+        if self._skip_lf:
+            # CRLF split between chunks, the CR already ended the line
+            self._skip_lf = False
+            if chunk[:1] == b"\n":
+                chunk = chunk[1:]
+        # a line in progress never contains CR, so a chunk without CR only has LF-terminated lines
+        if _CR not in chunk:
+            if _LF not in chunk:
+                if chunk:
+                    self._pending.append(chunk)
+                return []
+            return self._feed_lf(self._take_line(chunk))
+        return self._feed_any(self._take_line(chunk))
+
+    def _take_line(self, chunk: bytes) -> bytes:
+        pending = self._pending
+        if not pending:
+            return chunk
+        pending.append(chunk)
+        chunk = b"".join(pending)
+        pending.clear()
+        return chunk
+
+    def _feed_lf(self, chunk: bytes) -> list[ServerSentEvent]:
+        # LF-only streams, i.e. practically all of them: complete lines are split off in a single pass
+        lines = chunk.split(b"\n")
+        rest = lines.pop()
+        if rest:
+            self._pending.append(rest)
+        events = []
+        data = self._data
+        for line in lines:
+            # `data: ` lines are by far the most frequent, so they skip the generic field handling
+            if line.startswith(b"data: "):
+                data.append(line[6:].decode("utf-8"))
+            elif not line:
+                event = self._dispatch()
+                if event is not None:
+                    events.append(event)
+                    data = self._data
+            else:
+                self._process_line(line)
+        return events
+
+    def _feed_any(self, chunk: bytes) -> list[ServerSentEvent]:
+        # lines are terminated by CRLF, LF or a lone CR
+        events = []
+        data = self._data
+        start = 0
+        while True:
+            newline = chunk.find(_LF, start)
+            cr = chunk.find(_CR, start, len(chunk) if newline == -1 else newline)
+            if cr != -1:
+                end = cr
+                if cr + 1 == len(chunk):
+                    self._skip_lf = True
+                next_start = cr + 2 if cr + 1 == newline else cr + 1
+            elif newline == -1:
+                break
+            else:
+                end, next_start = newline, newline + 1
+
+            line = chunk[start:end]
+            if line.startswith(b"data: "):
+                data.append(line[6:].decode("utf-8"))
+            elif not line:
+                event = self._dispatch()
+                if event is not None:
+                    events.append(event)
+                    data = self._data
+            else:
+                self._process_line(line)
+            start = next_start
+        if start < len(chunk):
+            self._pending.append(chunk[start:])
+        return events
+
+    def flush(self) -> list[ServerSentEvent]:
+        """
+        Dispatch whatever is left once the stream is over, including an event without trailing blank line.
+        """
+        events = []
+        self._skip_lf = False
+        if self._pending:
+            events = self.feed(b"\n")
+        event = self._dispatch()
+        if event is not None:
+            events.append(event)
+        return events
+
+    def _process_line(self, line: bytes) -> None:
+        if line[0] == 0x3A:  # ':' comment line, e.g. keep-alive ping
+            return
+        name, _, value = line.partition(b":")
+        if value[:1] == b" ":
+            value = value[1:]
+        name, value = name.decode("utf-8"), value.decode("utf-8")
+
+        if name == "data":
+            self._data.append(value)
+        elif name == "event":
+            self._event = value
+        elif name == "id":
+            if "\0" not in value:
+                self._last_id = value
+        elif name == "retry":
+            if value.isdigit():
+                self._retry = int(value)
+
+    def _dispatch(self) -> ServerSentEvent | None:
+        if not self._data:
+            self._event = None
+            return None
+        data = self._data[0] if len(self._data) == 1 else "\n".join(self._data)
+        event = ServerSentEvent(data, self._event or "message", self._last_id, self._retry)
+        self._data = []
+        self._event = None
+        return event
+
+
+def parse_delta(data: str) -> ChunkDelta:
+    """
+    Extract `choices[0].delta.content`, `delta.role`, `finish_reason` and `usage` from chunk JSON.
+    """
+    chunk = json.loads(data)
+    if "error" in chunk:
+        raise Exception(f"Stream error: {chunk['error']}")
+
+    choices = chunk.get("choices") or []
+    choice = choices[0] if choices else {}
+    delta = choice.get("delta") or {}
+    content = delta.get("content")
+    return ChunkDelta(
+        content if isinstance(content, str) else None,
+        choice.get("finish_reason"),
+        chunk.get("usage"),
+        delta.get("role"),
+    )
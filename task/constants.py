@@ -2,4 +2,13 @@ import os
 
 DEFAULT_SYSTEM_PROMPT = "You are an assistant who answers concisely and informatively."
 DIAL_ENDPOINT = "https://ai-proxy.lab.epam.com"
-API_KEY = os.getenv('DIAL_API_KEY', 'dial-4pm5r7gnnzgzfw5fzbshcjs4j6w')
\ No newline at end of file
+API_KEY = os.getenv('DIAL_API_KEY', 'dial-4pm5r7gnnzgzfw5fzbshcjs4j6w')
+# Context window sizes in tokens per deployment, used to trim long conversations
+CONTEXT_BUDGETS = {
+    "gpt-4o": 128_000,
+    "gpt-4o-mini": 128_000,
+    "gpt-4-turbo": 128_000,
+    "gpt-4": 8_192,
+    "gpt-35-turbo": 16_385,
+}
+DEFAULT_CONTEXT_BUDGET = 8_192
@@ -0,0 +1,406 @@
+"""
+Multi-user chat service over HTTP, sharing one pooled client between all sessions.
+
+    python -m task.gateway [--port 8080] [--client custom] [--sessions sessions.db] [--tenant-concurrency 4]
+
+    POST   /sessions                  create a session, body `{"system_prompt": ...}` is optional
+    GET    /sessions/{id}             messages of the session
+    DELETE /sessions/{id}
+    POST   /sessions/{id}/messages    `{"content": ..., "stream": true}`, the answer is sent as SSE events
+                                      `data: {"type": "content", "content": ...}` ended by `data: [DONE]`,
+                                      or as a single JSON message with `"stream": false`
+    GET    /health
+
+Requests are counted against the tenant named in the `X-Tenant-Id` header; over the limit they get 429.
+Identical requests in flight at the same time share one upstream call. On SIGTERM or SIGINT health checks
+and new requests get 503 for `--drain-grace` seconds while the port stays open, so load balancers take the
+instance out of rotation; then the port is closed and requests in progress are given `--drain-timeout`
+seconds to finish.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import signal
+import sqlite3
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Awaitable, Callable, TypeVar
+
+from aiohttp import web
+
+from task.clients.base import BaseClient
+from task.clients.coalesce import CoalescingClient
+from task.clients.events import DeltaEvent, to_dict
+from task.clients.factory import CLIENT_KINDS, create_client
+from task.clients.sinks import MessageAssembler, Sink, pipe
+from task.constants import DEFAULT_SYSTEM_PROMPT, DIAL_ENDPOINT
+from task.models.context import ContextWindow
+from task.models.conversation import Conversation
+from task.models.message import Message
+from task.models.role import Role
+
+DEFAULT_TENANT = "default"
+
+T = TypeVar("T")
+
+
+@dataclass
+class GatewaySettings:
+    max_sessions: int = 10_000
+    tenant_concurrency: int = 4
+    tenant_header: str = "X-Tenant-Id"
+    drain_grace: float = 5.0
+    drain_timeout: float = 30.0
+
+
+class SessionStore:
+    """
+    Conversations by ID, at most `max_sessions` of them in memory. Least recently used ones are moved
+    to an sqlite file when `path` is given and dropped otherwise; `close` saves the rest there too.
+    All sqlite work runs on one worker thread, in submission order, so the event loop never waits for disk
+    and a session saved on eviction is always visible to the lookup that follows.
+    """
+
+    def __init__(self, max_sessions: int = 10_000, path: str | None = None):
+        self._max_sessions = max_sessions
+        self._sessions: OrderedDict[str, Conversation] = OrderedDict()
+        # requests to the same session are serialized, locks live only while someone holds them
+        self._locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+
+        self._db: sqlite3.Connection | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, messages TEXT NOT NULL)")
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-store")
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
+
+    async def get(self, session_id: str) -> Conversation | None:
+        conversation = self._sessions.get(session_id)
+        if conversation is not None:
+            self._sessions.move_to_end(session_id)
+            return conversation
+
+        if self._db is None:
+            return None
+        row = await self._run(self._load, session_id)
+        # another request may have loaded the session meanwhile, there must be only one copy of it
+        conversation = self._sessions.get(session_id)
+        if conversation is not None or row is None:
+            return conversation
+        messages = [Message(Role(msg["role"]), msg["content"]) for msg in json.loads(row)]
+        conversation = Conversation(session_id, messages)
+        await self.put(conversation)
+        return conversation
+
+    async def put(self, conversation: Conversation) -> None:
+        self._sessions[conversation.id] = conversation
+        self._sessions.move_to_end(conversation.id)
+        # a copy left on disk is outdated, but harmless: memory is looked up first and eviction overwrites it
+        while len(self._sessions) > self._max_sessions:
+            _, evicted = self._sessions.popitem(last=False)
+            if self._db is not None:
+                await self._run(self._save, evicted.id, _encode_messages(evicted))
+
+    async def delete(self, session_id: str) -> bool:
+        deleted = self._sessions.pop(session_id, None) is not None
+        if self._db is not None:
+            deleted = await self._run(self._delete, session_id) or deleted
+        return deleted
+
+    async def close(self) -> None:
+        if self._db is not None:
+            sessions = [(conversation.id, _encode_messages(conversation)) for conversation in self._sessions.values()]
+            await self._run(self._save_all, sessions)
+            self._executor.shutdown()
+            self._db.close()
+            self._db = None
+        self._sessions.clear()
+
+    async def _run(self, function: Callable[..., T], *args) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _load(self, session_id: str) -> str | None:
+        row = self._db.execute("SELECT messages FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return None if row is None else row[0]
+
+    def _save(self, session_id: str, messages: str) -> None:
+        self._db.execute("INSERT OR REPLACE INTO sessions (id, messages) VALUES (?, ?)", (session_id, messages))
+
+    def _save_all(self, sessions: list[tuple[str, str]]) -> None:
+        self._db.executemany("INSERT OR REPLACE INTO sessions (id, messages) VALUES (?, ?)", sessions)
+
+    def _delete(self, session_id: str) -> bool:
+        return self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount > 0
+
+
+def _encode_messages(conversation: Conversation) -> str:
+    # messages cache their own JSON, so the history is only joined, not serialized again
+    return f'[{",".join(msg.to_json() for msg in conversation.get_messages())}]'
+
+
+class _SSEResponseSink(Sink):
+    """
+    Writes events to the HTTP response as SSE. Headers are sent with the first event, so a request
+    failing before it can still be answered with an error status.
+    """
+
+    def __init__(self, request: web.Request):
+        self._request = request
+        self.response: web.StreamResponse | None = None
+
+    async def prepare(self) -> None:
+        self.response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+        })
+        await self.response.prepare(self._request)
+
+    async def send(self, event: DeltaEvent) -> None:
+        await self.write(to_dict(event))
+
+    async def write(self, data: dict) -> None:
+        if self.response is None:
+            await self.prepare()
+        await self.response.write(b"data: " + json.dumps(data, ensure_ascii=False).encode("utf-8") + b"\n\n")
+
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+class ChatGateway:
+
+    def __init__(self, client: BaseClient, store: SessionStore, settings: GatewaySettings):
+        self._client = client if isinstance(client, CoalescingClient) else CoalescingClient(client)
+        self._store = store
+        self._settings = settings
+        self._context_window = ContextWindow.for_deployment(client.deployment_name)
+        self._tenants: dict[str, int] = {}
+        self._active = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._draining = False
+
+    @property
+    def client(self) -> CoalescingClient:
+        return self._client
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._admit])
+        app.router.add_get("/health", self._health)
+        app.router.add_post("/sessions", self._create_session)
+        app.router.add_get("/sessions/{session_id}", self._get_session)
+        app.router.add_delete("/sessions/{session_id}", self._delete_session)
+        app.router.add_post("/sessions/{session_id}/messages", self._post_message)
+        app.on_shutdown.append(self._drain)
+        app.on_cleanup.append(self._cleanup)
+        return app
+
+    @web.middleware
+    async def _admit(self, request: web.Request, handler: Handler) -> web.StreamResponse:
+        if request.path == "/health":
+            return await handler(request)
+        if self._draining:
+            # connections kept alive by the load balancer still deliver requests while shutting down
+            return _error(503, "Shutting down", headers={"Connection": "close", "Retry-After": "1"})
+
+        tenant = request.headers.get(self._settings.tenant_header) or DEFAULT_TENANT
+        active = self._tenants.get(tenant, 0)
+        if active >= self._settings.tenant_concurrency:
+            return _error(429, "Too many concurrent requests", headers={"Retry-After": "1"})
+
+        self._tenants[tenant] = active + 1
+        self._active += 1
+        self._idle.clear()
+        try:
+            return await handler(request)
+        finally:
+            # entries of idle tenants are removed, so the table does not grow with every tenant ever seen
+            if self._tenants[tenant] == 1:
+                del self._tenants[tenant]
+            else:
+                self._tenants[tenant] -= 1
+            self._active -= 1
+            if not self._active:
+                self._idle.set()
+
+    async def _health(self, request: web.Request) -> web.Response:
+        if self._draining:
+            return _error(503, "Shutting down")
+        return web.json_response({
+            "status": "ok",
+            "active_requests": self._active,
+            "sessions_in_memory": len(self._store),
+            "upstream_requests": self._client.stats.upstream,
+            "coalesced_requests": self._client.stats.coalesced,
+        })
+
+    async def _create_session(self, request: web.Request) -> web.Response:
+        body = await _read_json(request) if request.can_read_body else {}
+        system_prompt = body.get("system_prompt") or DEFAULT_SYSTEM_PROMPT
+        if not isinstance(system_prompt, str):
+            raise web.HTTPBadRequest(text="`system_prompt` must be a string")
+
+        conversation = Conversation()
+        conversation.add_message(Message(Role.SYSTEM, system_prompt))
+        await self._store.put(conversation)
+        return web.json_response({"id": conversation.id}, status=201)
+
+    async def _get_session(self, request: web.Request) -> web.Response:
+        session_id = request.match_info["session_id"]
+        async with self._store.lock(session_id):
+            conversation = await self._store.get(session_id)
+            if conversation is None:
+                return _error(404, "Session not found")
+            return web.json_response({"id": conversation.id, "messages": conversation.get_payload()})
+
+    async def _delete_session(self, request: web.Request) -> web.Response:
+        session_id = request.match_info["session_id"]
+        async with self._store.lock(session_id):
+            if not await self._store.delete(session_id):
+                return _error(404, "Session not found")
+        return web.Response(status=204)
+
+    async def _post_message(self, request: web.Request) -> web.StreamResponse:
+        body = await _read_json(request)
+        content = body.get("content")
+        if not isinstance(content, str) or not content.strip():
+            return _error(400, "`content` must be a non-empty string")
+
+        session_id = request.match_info["session_id"]
+        async with self._store.lock(session_id):
+            conversation = await self._store.get(session_id)
+            if conversation is None:
+                return _error(404, "Session not found")
+            conversation.add_message(Message(Role.USER, content))
+
+            assembler = MessageAssembler()
+            sink = _SSEResponseSink(request) if body.get("stream", True) else None
+            sinks = [assembler] if sink is None else [assembler, sink]
+            try:
+                await pipe(self._client.stream_events(self._context_window.fit(conversation)), *sinks)
+            except BaseException as error:
+                # a failed turn is forgotten, so the user can simply send the message again
+                conversation.messages.pop()
+                await self._store.put(conversation)
+                if not isinstance(error, Exception) or isinstance(error, ConnectionError):
+                    raise
+                if sink is None or sink.response is None:
+                    return _error(502, f"Upstream error: {error}")
+                # headers are already sent, the error goes to the client as the last event
+                await sink.write({"type": "error", "message": str(error)})
+                await sink.response.write_eof()
+                return sink.response
+
+            conversation.add_message(assembler.message)
+            # the session may have been evicted while the answer was streamed, this brings it back
+            await self._store.put(conversation)
+            if sink is None:
+                return web.json_response(assembler.message.to_dict())
+            if sink.response is None:
+                await sink.prepare()
+            await sink.response.write(b"data: [DONE]\n\n")
+            await sink.response.write_eof()
+            return sink.response
+
+    async def start_draining(self) -> None:
+        """
+        Answer health checks and new requests with 503 for `drain_grace` seconds, to be called while the server
+        still listens. Requests in progress are waited for once the app shuts down.
+        """
+        self._draining = True
+        await asyncio.sleep(self._settings.drain_grace)
+
+    async def _drain(self, app: web.Application) -> None:
+        # shutdown hooks run after the port is closed, only requests already in progress are left
+        self._draining = True
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._idle.wait(), self._settings.drain_timeout)
+
+    async def _cleanup(self, app: web.Application) -> None:
+        await self._client.close()
+        await self._store.close()
+
+
+async def _read_json(request: web.Request) -> dict:
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise web.HTTPBadRequest(text="Request body must be JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="Request body must be a JSON object")
+    return body
+
+
+def _error(status: int, message: str, headers: dict[str, str] | None = None) -> web.Response:
+    return web.json_response({"error": {"message": message}}, status=status, headers=headers)
+
+
+async def serve(gateway: ChatGateway, host: str, port: int) -> None:
+    """
+    Run the gateway until SIGTERM or SIGINT, then drain it: first while still listening, so health checks
+    can report the shutdown, then with the port closed until the requests in progress are done.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+
+    # requests in progress were already given `drain_timeout` by the shutdown hook, aiohttp's own wait
+    # only has to cover the last writes of responses that finished just in time
+    runner = web.AppRunner(gateway.create_app(), shutdown_timeout=1.0)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+        print(f"Serving on http://{host}:{port}", flush=True)
+        await stop.wait()
+        await gateway.start_draining()
+    finally:
+        await runner.cleanup()
+
+
+async def _main(args: argparse.Namespace) -> None:
+    settings = GatewaySettings(
+        max_sessions=args.max_sessions,
+        tenant_concurrency=args.tenant_concurrency,
+        drain_grace=args.drain_grace,
+        drain_timeout=args.drain_timeout,
+    )
+    store = SessionStore(args.max_sessions, args.sessions)
+    client = create_client(args.client, args.deployment, args.endpoint, args.cache)
+    await serve(ChatGateway(client, store, settings), args.host, args.port)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--client", choices=CLIENT_KINDS, default="custom")
+    parser.add_argument("--deployment", default="gpt-4o")
+    parser.add_argument("--endpoint", default=DIAL_ENDPOINT)
+    parser.add_argument("--sessions", default=None, help="sqlite file to move evicted sessions to")
+    parser.add_argument("--max-sessions", type=int, default=10_000, help="sessions kept in memory")
+    parser.add_argument("--tenant-concurrency", type=int, default=4, help="requests in progress per tenant")
+    parser.add_argument("--drain-grace", type=float, default=5.0,
+                        help="seconds to fail health checks on shutdown before the port is closed")
+    parser.add_argument("--drain-timeout", type=float, default=30.0, help="seconds to finish requests on shutdown")
+    parser.add_argument("--cache", default=None, help="sqlite file to cache responses of repeated prompts in")
+    args = parser.parse_args()
+
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+from bisect import bisect_left
+from typing import Callable
+
+from task.constants import CONTEXT_BUDGETS, DEFAULT_CONTEXT_BUDGET
+from task.models.conversation import Conversation
+from task.models.message import Message
+from task.models.role import Role
+
+# Receives the previous summary (if any) and the messages dropped since it was made, returns new summary
+Summarizer = Callable[[Message | None, list[Message]], Message]
+
+
+class ContextWindow:
+    """
+    Selects the messages of a conversation that fit into the deployment context budget.
+    Leading system messages are always kept, the oldest turns after them are dropped first
+    and, when `summarizer` is given, replaced by a single summary message.
+    Summaries are kept on the conversation, so one window can serve many conversations.
+    """
+
+    def __init__(self, budget: int, reserve: int = 1024, summarizer: Summarizer | None = None):
+        if budget <= reserve:
+            raise ValueError("Context budget must be greater than the reserve for the response")
+        self._limit = budget - reserve
+        self._summarizer = summarizer
+
+    @classmethod
+    def for_deployment(cls, deployment_name: str, reserve: int = 1024, summarizer: Summarizer | None = None):
+        return cls(CONTEXT_BUDGETS.get(deployment_name, DEFAULT_CONTEXT_BUDGET), reserve, summarizer)
+
+    def fit(self, conversation: Conversation) -> list[Message]:
+        messages = conversation.get_messages()
+        totals = conversation.get_token_totals()
+
+        head = 0
+        while head < len(messages) and messages[head].role == Role.SYSTEM:
+            head += 1
+
+        start = self._first_fitting(totals, head, head, self._limit)
+        if start == head:
+            return messages
+        start = self._turn_start(messages, start)
+        if self._summarizer is None:
+            return messages[:head] + messages[start:]
+
+        # messages already in the summary are never sent again, even when the (smaller) new summary leaves room
+        start = max(start, conversation.summarized_until)
+        while True:
+            if start > conversation.summarized_until:
+                dropped = messages[max(head, conversation.summarized_until):start]
+                conversation.summary = self._summarizer(conversation.summary, dropped)
+                conversation.summarized_until = start
+            # summary takes room too, so a few more turns may have to go into it
+            limit = self._limit - conversation.summary.estimate_tokens()
+            fitting = self._turn_start(messages, self._first_fitting(totals, head, start, limit))
+            if fitting == start:
+                return messages[:head] + [conversation.summary] + messages[start:]
+            start = fitting
+
+    @staticmethod
+    def _turn_start(messages: list[Message], start: int) -> int:
+        """
+        Move the cut forward to the next user message, so the kept history does not open with an answer.
+        """
+        last = len(messages) - 1
+        while start < last and messages[start].role != Role.USER:
+            start += 1
+        return start
+
+    @staticmethod
+    def _first_fitting(totals: list[int], head: int, lowest: int, limit: int) -> int:
+        """
+        Smallest `start >= lowest` such that system messages plus `messages[start:]` fit into `limit`.
+        The last message is always kept, even if it does not fit on its own.
+        """
+        last = len(totals) - 1
+        start = bisect_left(totals, totals[last] + totals[head] - limit, lo=lowest)
+        return min(start, max(lowest, last - 1))
@@ -8,10 +8,47 @@ from task.models.message import Message
 class Conversation:
     id: str = field(default_factory=lambda: str(uuid.uuid4()))
     messages: list[Message] = field(default_factory=list)
+    # request payload and running token totals are extended on every new message instead of being rebuilt
+    _payload: list[dict[str, str]] = field(default_factory=list, init=False, repr=False)
+    _token_totals: list[int] = field(default_factory=lambda: [0], init=False, repr=False)
+    _synced: list[Message] = field(default_factory=list, init=False, repr=False)
+    # maintained by `ContextWindow`: summary of `messages[:summarized_until]` after the system prompt
+    summary: Message | None = field(default=None, init=False, repr=False)
+    summarized_until: int = field(default=0, init=False, repr=False)
 
     def add_message(self, message: Message) -> None:
         self.messages.append(message)
+        self._sync()
 
     def get_messages(self) -> list[Message]:
         return self.messages
-    
\ No newline at end of file
+
+    def get_payload(self) -> list[dict[str, str]]:
+        self._sync()
+        return self._payload
+
+    def get_token_totals(self) -> list[int]:
+        """
+        Prefix sums of estimated tokens: item `i` is the token count of the first `i` messages.
+        """
+        self._sync()
+        return self._token_totals
+
+    @property
+    def token_count(self) -> int:
+        return self.get_token_totals()[-1]
+
+    def _sync(self) -> None:
+        # catches up with messages appended to the list directly, e.g. passed to the constructor;
+        # any other edit of the list (pop, insert, replace) invalidates the whole cache
+        synced = len(self._synced)
+        if len(self.messages) < synced or self.messages[:synced] != self._synced:
+            self._synced.clear()
+            self._payload.clear()
+            del self._token_totals[1:]
+            self.summary = None
+            self.summarized_until = 0
+        for message in self.messages[len(self._synced):]:
+            self._synced.append(message)
+            self._payload.append(message.to_dict())
+            self._token_totals.append(self._token_totals[-1] + message.estimate_tokens())
@@ -1,15 +1,40 @@
-from dataclasses import dataclass
+import json
+from dataclasses import dataclass, field
 
 from task.models.role import Role
 
+TOKENS_PER_MESSAGE = 4
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class Message:
     role: Role
     content: str
+    # message is immutable, so its serialized forms are computed once and reused on every turn
+    _dict: dict[str, str] | None = field(default=None, init=False, repr=False, compare=False)
+    _json: str | None = field(default=None, init=False, repr=False, compare=False)
+    _tokens: int | None = field(default=None, init=False, repr=False, compare=False)
 
     def to_dict(self) -> dict[str, str]:
-        return {
-            "role": self.role.value,
-            "content": self.content
-        }
\ No newline at end of file
+        """
+        Cached request representation, shared between calls, so it must not be modified.
+        """
+        if self._dict is None:
+            object.__setattr__(self, "_dict", {
+                "role": self.role.value,
+                "content": self.content
+            })
+        return self._dict
+
+    def to_json(self) -> str:
+        if self._json is None:
+            object.__setattr__(self, "_json", json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":")))
+        return self._json
+
+    def estimate_tokens(self) -> int:
+        """
+        Rough token count (~4 characters per token plus per-message overhead), no tokenizer needed.
+        """
+        if self._tokens is None:
+            object.__setattr__(self, "_tokens", len(self.content or "") // 4 + TOKENS_PER_MESSAGE)
+        return self._tokens
@@ -0,0 +1,54 @@
+import sqlite3
+import sys
+import time
+
+from task.clients.cache import ResponseCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_bytes=2 * sys.getsizeof("a" * 100))
+    cache.put("a", "a" * 100)
+    cache.put("b", "b" * 100)
+    assert cache.get("a") is not None
+    cache.put("c", "c" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "a" * 100
+    assert cache.get("c") == "c" * 100
+    assert cache.stats.evictions == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = ResponseCache(ttl=0.01)
+    cache.put("a", "answer")
+    assert cache.get("a") == "answer"
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.stats.expirations == 1
+    assert cache.stats.misses == 1
+
+
+def test_disk_hit_is_promoted_to_memory(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = ResponseCache(path=path)
+    first.put("a", "answer")
+    first.close()
+
+    second = ResponseCache(path=path)
+    assert second.get("a") == "answer"
+    assert second.get("a") == "answer"
+    assert (second.stats.disk_hits, second.stats.hits) == (1, 1)
+    second.close()
+
+
+def test_expired_rows_are_purged_from_disk(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(ttl=0.01, path=path, purge_interval=0.0)
+    cache.put("a", "old")
+    time.sleep(0.02)
+    cache.put("b", "new")
+    cache.close()
+
+    with sqlite3.connect(path) as db:
+        assert [row[0] for row in db.execute("SELECT key FROM responses")] == ["b"]
@@ -0,0 +1,110 @@
+import asyncio
+
+from task.clients.base import BaseClient
+from task.clients.coalesce import CoalescingClient
+from task.clients.events import ContentDelta, FinishDelta
+from task.models.message import Message
+from task.models.role import Role
+
+MESSAGES = [Message(Role.USER, "What is the capital of France?")]
+
+
+class _GatedClient(BaseClient):
+    """
+    Streams `words` one by one, each only after `gate` is released.
+    """
+
+    def __init__(self, words: list[str], error: Exception | None = None):
+        super().__init__("gpt-4o")
+        self.words = words
+        self.error = error
+        self.gate = asyncio.Semaphore(0)
+        self.calls = 0
+        self.closed = 0
+
+    def get_completion(self, messages: list[Message]) -> Message:
+        raise NotImplementedError
+
+    async def aget_completion(self, messages: list[Message]) -> Message:
+        raise NotImplementedError
+
+    async def stream_events(self, messages: list[Message]):
+        self.calls += 1
+        try:
+            for word in self.words:
+                await self.gate.acquire()
+                yield ContentDelta(word)
+            if self.error is not None:
+                raise self.error
+            yield FinishDelta("stop")
+        finally:
+            self.closed += 1
+
+
+async def _collect(client: BaseClient) -> list:
+    return [event async for event in client.stream_events(MESSAGES)]
+
+
+def test_late_joiner_replays_the_whole_stream():
+    async def run():
+        upstream = _GatedClient(["Paris ", "is ", "nice"])
+        client = CoalescingClient(upstream)
+        first = asyncio.create_task(_collect(client))
+        upstream.gate.release()
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(_collect(client))
+        for _ in range(2):
+            upstream.gate.release()
+        return upstream, client, await first, await second
+
+    upstream, client, first, second = asyncio.run(run())
+    assert first == second == [ContentDelta("Paris "), ContentDelta("is "), ContentDelta("nice"), FinishDelta("stop")]
+    assert upstream.calls == 1
+    assert (client.stats.upstream, client.stats.coalesced) == (1, 1)
+
+
+def test_upstream_is_cancelled_when_last_waiter_leaves():
+    async def run():
+        upstream = _GatedClient(["Paris ", "is ", "nice"])
+        client = CoalescingClient(upstream)
+        streams = [client.stream_events(MESSAGES), client.stream_events(MESSAGES)]
+        upstream.gate.release()
+        for stream in streams:
+            assert await anext(stream) == ContentDelta("Paris ")
+
+        await streams[0].aclose()
+        await asyncio.sleep(0.01)
+        closed_after_first = upstream.closed
+        await streams[1].aclose()
+        await asyncio.sleep(0.01)
+        return upstream, closed_after_first
+
+    upstream, closed_after_first = asyncio.run(run())
+    assert closed_after_first == 0
+    assert upstream.closed == 1
+
+
+def test_upstream_error_reaches_every_waiter():
+    async def run():
+        upstream = _GatedClient(["Paris "], error=ConnectionError("reset"))
+        client = CoalescingClient(upstream)
+        waiters = [asyncio.create_task(_collect(client)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        upstream.gate.release()
+        return upstream, await asyncio.gather(*waiters, return_exceptions=True)
+
+    upstream, results = asyncio.run(run())
+    assert upstream.calls == 1
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+def test_finished_stream_is_not_joined():
+    async def run():
+        upstream = _GatedClient([])
+        client = CoalescingClient(upstream)
+        await _collect(client)
+        await _collect(client)
+        return upstream
+
+    assert asyncio.run(run()).calls == 2
+
@@ -0,0 +1,71 @@
+from task.models.context import ContextWindow
+from task.models.conversation import Conversation
+from task.models.message import Message
+from task.models.role import Role
+
+
+def _conversation(turns: int, size: int = 400) -> Conversation:
+    conversation = Conversation()
+    conversation.add_message(Message(Role.SYSTEM, "system"))
+    for i in range(turns):
+        conversation.add_message(Message(Role.USER, f"q{i} " + "x" * size))
+        conversation.add_message(Message(Role.AI, f"a{i} " + "y" * size * 3))
+    conversation.add_message(Message(Role.USER, "last"))
+    return conversation
+
+
+def test_payload_follows_in_place_edits():
+    conversation = Conversation()
+    conversation.add_message(Message(Role.USER, "a"))
+    conversation.add_message(Message(Role.AI, "b"))
+    assert conversation.token_count == 2 * (1 // 4 + 4)
+
+    conversation.messages.pop()
+    conversation.add_message(Message(Role.USER, "c"))
+    assert conversation.get_payload() == [{"role": "user", "content": "a"}, {"role": "user", "content": "c"}]
+
+    conversation.messages[0] = Message(Role.USER, "d" * 40)
+    assert conversation.get_payload()[0]["content"] == "d" * 40
+    assert conversation.token_count == (40 // 4 + 4) + (1 // 4 + 4)
+
+
+def test_trimmed_history_starts_with_user_turn():
+    window = ContextWindow(2000, 500)
+    for turns in range(1, 12):
+        messages = window.fit(_conversation(turns))
+        assert messages[0].role == Role.SYSTEM
+        if len(messages) > 1:
+            assert messages[1].role == Role.USER
+        assert sum(msg.estimate_tokens() for msg in messages) <= 1500 or len(messages) == 2
+
+
+def test_summaries_are_per_conversation():
+    def summarize(previous: Message | None, dropped: list[Message]) -> Message:
+        return Message(Role.SYSTEM, f"summary of {dropped[0].content[:2]}")
+
+    window = ContextWindow(2000, 500, summarizer=summarize)
+    first, second = _conversation(10), _conversation(10)
+    second.messages[1] = Message(Role.USER, "other " + "x" * 400)
+
+    first_summary = window.fit(first)[1]
+    second_summary = window.fit(second)[1]
+    assert first_summary.content == "summary of q0"
+    assert second_summary.content == "summary of ot"
+    assert window.fit(first)[1] is first_summary
+
+
+def test_summarized_messages_are_not_sent_again():
+    def summarize(previous: Message | None, dropped: list[Message]) -> Message:
+        # a long first summary pushes the cut far ahead of where the plain budget would put it
+        return Message(Role.SYSTEM, "s" * (4000 if previous is None else 40))
+
+    window = ContextWindow(2000, 500, summarizer=summarize)
+    conversation = Conversation()
+    conversation.add_message(Message(Role.SYSTEM, "system"))
+    for i in range(14):
+        conversation.add_message(Message(Role.USER, f"q{i:02} " + "x" * 400))
+        messages = window.fit(conversation)
+        if conversation.summary is not None:
+            kept = conversation.messages[conversation.summarized_until:]
+            assert messages == conversation.messages[:1] + [conversation.summary] + kept
+        conversation.add_message(Message(Role.AI, f"a{i:02} " + "y" * 400))
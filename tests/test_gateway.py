@@ -0,0 +1,109 @@
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from task.clients.base import BaseClient
+from task.clients.events import ContentDelta, FinishDelta
+from task.gateway import ChatGateway, GatewaySettings, SessionStore
+from task.models.conversation import Conversation
+from task.models.message import Message
+from task.models.role import Role
+
+
+class _SlowClient(BaseClient):
+    """
+    Answers every request with the same text once `gate` is set.
+    """
+
+    def __init__(self):
+        super().__init__("gpt-4o")
+        self.gate = asyncio.Event()
+
+    def get_completion(self, messages: list[Message]) -> Message:
+        raise NotImplementedError
+
+    async def aget_completion(self, messages: list[Message]) -> Message:
+        raise NotImplementedError
+
+    async def stream_events(self, messages: list[Message]):
+        await self.gate.wait()
+        yield ContentDelta("Paris")
+        yield FinishDelta("stop")
+
+
+def _conversation(content: str) -> Conversation:
+    conversation = Conversation()
+    conversation.add_message(Message(Role.USER, content))
+    return conversation
+
+
+def test_evicted_session_is_reloaded_from_disk(tmp_path):
+    async def run():
+        store = SessionStore(max_sessions=2, path=str(tmp_path / "sessions.db"))
+        conversations = [_conversation(f"question {i}") for i in range(3)]
+        for conversation in conversations:
+            await store.put(conversation)
+        in_memory = len(store)
+
+        reloaded = await store.get(conversations[0].id)
+        missing = await store.get("unknown")
+        await store.close()
+        return conversations[0], in_memory, reloaded, missing
+
+    evicted, in_memory, reloaded, missing = asyncio.run(run())
+    assert in_memory == 2
+    assert reloaded is not evicted
+    assert reloaded.get_payload() == evicted.get_payload()
+    assert missing is None
+
+
+def test_evicted_session_without_disk_is_gone():
+    async def run():
+        store = SessionStore(max_sessions=1)
+        first, second = _conversation("a"), _conversation("b")
+        await store.put(first)
+        await store.put(second)
+        return await store.get(first.id), await store.get(second.id)
+
+    first, second = asyncio.run(run())
+    assert first is None
+    assert second is not None
+
+
+def test_sessions_survive_restart(tmp_path):
+    async def run():
+        path = str(tmp_path / "sessions.db")
+        store = SessionStore(path=path)
+        conversation = _conversation("question")
+        await store.put(conversation)
+        await store.close()
+
+        reopened = SessionStore(path=path)
+        reloaded = await reopened.get(conversation.id)
+        await reopened.close()
+        return conversation, reloaded
+
+    conversation, reloaded = asyncio.run(run())
+    assert reloaded.get_payload() == conversation.get_payload()
+
+
+def test_tenant_over_limit_gets_429():
+    async def run():
+        upstream = _SlowClient()
+        gateway = ChatGateway(upstream, SessionStore(), GatewaySettings(tenant_concurrency=1))
+        async with TestClient(TestServer(gateway.create_app())) as client:
+            sessions = [(await (await client.post("/sessions")).json())["id"] for _ in range(2)]
+
+            def ask(session_id: str, tenant: str):
+                return client.post(f"/sessions/{session_id}/messages", headers={"X-Tenant-Id": tenant},
+                                   json={"content": "What is the capital of France?", "stream": False})
+
+            first = asyncio.create_task(ask(sessions[0], "a"))
+            await asyncio.sleep(0.05)
+            same_tenant = await ask(sessions[1], "a")
+            other_tenant = asyncio.create_task(ask(sessions[1], "b"))
+            await asyncio.sleep(0.05)
+            upstream.gate.set()
+            return same_tenant.status, (await first).status, (await other_tenant).status
+
+    assert asyncio.run(run()) == (429, 200, 200)
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+import pytest
+
+from task.clients.base import BaseClient
+from task.clients.events import ContentDelta, FinishDelta, RoleDelta
+from task.clients.router import HedgedClient
+from task.models.message import Message
+from task.models.role import Role
+
+MESSAGES = [Message(Role.USER, "What is the capital of France?")]
+
+
+class _FakeClient(BaseClient):
+    """
+    Answers with its own name after `delay` seconds, or fails with `error`.
+    """
+
+    def __init__(self, name: str, delay: float = 0.0, error: Exception | None = None):
+        super().__init__(name)
+        self.delay = delay
+        self.error = error
+        self.started = 0
+        self.cancelled = 0
+
+    def get_completion(self, messages: list[Message]) -> Message:
+        self.started += 1
+        if self.error is not None:
+            raise self.error
+        return Message(Role.AI, self.deployment_name)
+
+    async def aget_completion(self, messages: list[Message]) -> Message:
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return Message(Role.AI, self.deployment_name)
+
+    async def stream_events(self, messages: list[Message]):
+        self.started += 1
+        try:
+            yield RoleDelta(Role.AI)
+            await asyncio.sleep(self.delay)
+            if self.error is not None:
+                raise self.error
+            yield ContentDelta(self.deployment_name)
+            yield FinishDelta("stop")
+        except (GeneratorExit, asyncio.CancelledError):
+            self.cancelled += 1
+            raise
+
+
+def test_backup_wins_when_primary_is_slow():
+    primary, backup = _FakeClient("primary", delay=1.0), _FakeClient("backup")
+    client = HedgedClient([primary, backup], hedge_delay=0.05)
+
+    started = time.perf_counter()
+    response = asyncio.run(client.aget_completion(MESSAGES))
+    assert response.content == "backup"
+    assert time.perf_counter() - started < 0.5
+    assert primary.cancelled == 1
+
+
+def test_backup_is_not_started_when_primary_is_fast():
+    primary, backup = _FakeClient("primary"), _FakeClient("backup")
+    response = asyncio.run(HedgedClient([primary, backup], hedge_delay=0.5).aget_completion(MESSAGES))
+    assert response.content == "primary"
+    assert backup.started == 0
+
+
+def test_failure_starts_backup_without_hedge_delay():
+    primary, backup = _FakeClient("primary", error=ConnectionError("reset")), _FakeClient("backup")
+    client = HedgedClient([primary, backup], hedge_delay=10.0)
+
+    started = time.perf_counter()
+    assert asyncio.run(client.aget_completion(MESSAGES)).content == "backup"
+    assert time.perf_counter() - started < 1.0
+
+
+def _failing_clients() -> tuple[list[BaseClient], Exception, Exception]:
+    first, second = ConnectionError("first"), TimeoutError("second")
+    return [_FakeClient("primary", error=first), _FakeClient("backup", error=second)], first, second
+
+
+def test_all_failures_are_chained():
+    clients, first, second = _failing_clients()
+    with pytest.raises(TimeoutError) as raised:
+        asyncio.run(HedgedClient(clients, hedge_delay=0.01).aget_completion(MESSAGES))
+    assert raised.value is second
+    assert raised.value.__cause__ is first
+
+    clients, first, second = _failing_clients()
+    with pytest.raises(TimeoutError) as raised:
+        HedgedClient(clients).get_completion(MESSAGES)
+    assert raised.value is second
+    assert raised.value.__cause__ is first
+
+
+def test_stream_continues_with_winner_and_closes_loser():
+    primary, backup = _FakeClient("primary", delay=1.0), _FakeClient("backup")
+
+    async def run():
+        client = HedgedClient([primary, backup], hedge_delay=0.05)
+        return [event async for event in client.stream_events(MESSAGES)]
+
+    assert asyncio.run(run()) == [RoleDelta(Role.AI), ContentDelta("backup"), FinishDelta("stop")]
+    assert primary.cancelled == 1
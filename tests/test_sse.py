@@ -0,0 +1,59 @@
+import pytest
+
+from task.clients.sse import SSEDecoder, parse_delta
+
+
+def _decode(*chunks: bytes) -> list[str]:
+    decoder = SSEDecoder()
+    events = []
+    for chunk in chunks:
+        events += decoder.feed(chunk)
+    events += decoder.flush()
+    return [event.data for event in events]
+
+
+def test_utf8_character_split_across_chunks():
+    payload = "data: Ville Lumière 🇫🇷\n\n".encode("utf-8")
+    for split_at in range(1, len(payload)):
+        assert _decode(payload[:split_at], payload[split_at:]) == ["Ville Lumière 🇫🇷"]
+
+
+@pytest.mark.parametrize("terminator", [b"\n", b"\r\n", b"\r"])
+def test_line_terminators(terminator):
+    stream = b"data: a" + terminator + terminator + b"data: b" + terminator + terminator
+    assert _decode(stream) == ["a", "b"]
+    # byte by byte, so CRLF is also split between chunks
+    assert _decode(*(stream[i:i + 1] for i in range(len(stream)))) == ["a", "b"]
+
+
+def test_multi_line_data_and_fields():
+    stream = b": ping\nevent: update\nid: 7\ndata: first\ndata:second\n\n"
+    decoder = SSEDecoder()
+    [event] = decoder.feed(stream)
+    assert (event.data, event.event, event.id) == ("first\nsecond", "update", "7")
+
+
+def test_unterminated_last_event_on_flush():
+    assert _decode(b"data: a\n\ndata: b") == ["a", "b"]
+
+
+def test_finish_reason_and_role_before_delta():
+    delta = parse_delta('{"choices":[{"index":0,"finish_reason":"stop","role":"x","delta":{"role":"assistant"}}]}')
+    assert delta.finish_reason == "stop"
+    assert delta.role == "assistant"
+    assert delta.content is None
+
+
+def test_content_outside_delta_is_ignored():
+    delta = parse_delta('{"choices":[{"index":0,"delta":{},"logprobs":{"content":"oops"}}]}')
+    assert delta.content is None
+
+
+def test_error_payload_raises():
+    with pytest.raises(Exception, match="Stream error"):
+        parse_delta('{"choices":[{"index":0,"delta":{"content":"a"}}],"error":{"message":"boom"}}')
+
+
+def test_usage():
+    delta = parse_delta('{"choices":[],"usage":{"prompt_tokens":1,"completion_tokens":2,"total_tokens":3}}')
+    assert delta.usage == {"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3}